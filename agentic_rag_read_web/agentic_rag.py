@@ -2,7 +2,7 @@ import warnings
 # Suppress all warnings
 warnings.filterwarnings("ignore")
 
-from typing import Annotated, Literal, Sequence, TypedDict
+from typing import Annotated, Literal, NotRequired, Sequence, TypedDict
 from langchain import hub
 from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
@@ -10,63 +10,73 @@ from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel, Field
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import tools_condition
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_community.vectorstores import Chroma
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.tools.retriever import create_retriever_tool
 from langgraph.graph import END, StateGraph, START
 from langgraph.prebuilt import ToolNode
+from vector_index import sync_index_batches, read_index_version
+from parallel_chunker import iter_chunk_batches
+from answer_cache import SemanticAnswerCache, CachedGraph
+from relevance_grader import DOCUMENT_SEPARATOR, RelevanceGrader
+from context_packer import ContextPacker
+from hybrid_retriever import HybridRetriever, LexicalIndex
+from quantized_store import QuantizedVectorStore
+from web_ingest import iter_documents
 
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 #USER_AGENT=os.getenv("USER_AGENT")
 
-from langchain_huggingface import HuggingFaceEmbeddings
-embeddings=HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
 from langchain_groq import ChatGroq
-llm = ChatGroq(model="llama-3.3-70b-versatile")
-
-#Testing llm model
-#print(llm.invoke("hello, how are you?"))
+from embedding_engine import CachedBatchEmbeddings
 
 urls = [
     "https://www.soccer.com/guide/rules-of-soccer-guide",
     "https://www.sportsengine.com/soccer/rules-soccer-offsides-explained#:~:text=The%20offside%20rule%20is%20one,defender%2C%20not%20including%20the%20goalkeeper."
 ]
 
-docs = [WebBaseLoader(url).load() for url in urls]
-text_splitter=RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=100, chunk_overlap=5)
-docs_list = [item for sublist in docs for item in sublist]
-doc_splits=text_splitter.split_documents(docs_list)
-
-vectorstore=Chroma.from_documents(
-    documents=doc_splits,
-    collection_name="rag-chrome",
-    embedding=embeddings   
-)
+#chroma, or mmap: a read-only quantized snapshot of the collection shared across worker processes
+VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "chroma")
 
-retriever = vectorstore.as_retriever()
+#Set by build(), not at import: spawned chunking and embedding workers re-import the launching
+#script, and must not load models or sync the index again
+embeddings = llm = rag_prompt = None
+vectorstore = lexical_index = search_store = retriever = retriever_tool = None
+relevance_grader = context_packer = app = answer_cache = cached_app = None
 
-retriever_tool = create_retriever_tool(
-    retriever,
-    "retrieve_blog_posts",
-    "Search these urls for soccer data and rules .You are a specialized assistant. Use the 'retriever_tool' **only** when the query explicitly relates soccer. For all other queries, respond directly without using any tool. For simple queries like 'hi', 'hello', or 'how are you', provide a normal response.",
-)
-
-tools=[retriever_tool]
+#Per-request budget for the rewriter -> ai_assistant loop
+MAX_REWRITES = int(os.getenv("RAG_MAX_REWRITES", "2"))
+MAX_SECONDS = float(os.getenv("RAG_MAX_SECONDS", "30"))
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
+    started_at: NotRequired[float]
+    rewrites: NotRequired[int]
+    best_docs: NotRequired[str]
+    best_score: NotRequired[float]
+    budget_spent: NotRequired[dict]
+    out_of_budget: NotRequired[bool]
+
+def budget_spent(state: AgentState):
+    return {
+        "rewrites": state.get("rewrites", 0),
+        "seconds": round(time.time() - state.get("started_at", time.time()), 3),
+    }
 
-def AI_Asisstant(state: AgentState):
+def budget_exhausted(state: AgentState):
+    spent = budget_spent(state)
+    return spent["rewrites"] >= MAX_REWRITES or spent["seconds"] >= MAX_SECONDS
+
+def AI_Asisstant(state: AgentState, tools):
     print("---CALL AGENT---")
+    #Clock starts before the first model call, so its latency counts against the budget
+    started_at = state.get("started_at", time.time())
     messages=state['messages']
     llm_with_tool=llm.bind_tools(tools)
     response=llm_with_tool.invoke(messages)
-    return {"messages": [response]}
+    return {"messages": [response], "started_at": started_at, "budget_spent": budget_spent({**state, "started_at": started_at})}
 
 # def retrieve(state):
 #     pass
@@ -75,6 +85,16 @@ def rewrite(state:AgentState):
     print("---TRANSFORM QUERY---")
     messages = state["messages"]
     question = messages[0].content
+
+    #Remember the best retrieval so far in case the budget runs out before one grades as relevant
+    updates = {}
+    docs = messages[-1].content
+    score = relevance_grader.score(question, docs)
+    if score > state.get("best_score", float("-inf")):
+        updates.update({"best_docs": docs, "best_score": score})
+    if budget_exhausted(state):
+        print(f"---BUDGET EXHAUSTED: {budget_spent(state)}---")
+        return {**updates, "out_of_budget": True}
     
     print(f"here is message from rewrite: {messages}")
     
@@ -83,7 +103,21 @@ def rewrite(state:AgentState):
                     Formulate an improved question: """)
        ]
     response = llm.invoke(message)
-    return {"messages": [response]}
+    return {**updates, "messages": [response], "rewrites": state.get("rewrites", 0) + 1}
+
+def check_budget(state:AgentState)->Literal["ai_assistant", "budget_answer"]:
+    if state.get("out_of_budget"):
+        return "budget_answer"
+    return "ai_assistant"
+
+def answer_from_docs(question, docs):
+    #Deduplicated, MMR-ordered and trimmed to the token budget before it reaches the prompt
+    docs = context_packer.pack(question, docs)
+    rag_chain = rag_prompt | llm
+
+    response = rag_chain.invoke({"context": docs, "question": question})
+    print(f"this is my response:{response}")
+    return response
 
 def generate(state:AgentState):
     print("---GENERATE---")
@@ -91,20 +125,25 @@ def generate(state:AgentState):
     question = messages[0].content
     last_message = messages[-1]
     docs = last_message.content
-    
-    prompt = hub.pull("rlm/rag-prompt")
-    
-    rag_chain = prompt | llm
 
-    response = rag_chain.invoke({"context": docs, "question": question})
-    print(f"this is my response:{response}")
+    response = answer_from_docs(question, docs)
     
-    return {"messages": [response]}
+    return {"messages": [response], "budget_spent": budget_spent(state)}
+
+def budget_answer(state:AgentState):
+    #Degrade gracefully: answer from the best chunks seen, or directly when nothing was retrieved
+    print("---BUDGET ANSWER---")
+    question = state["messages"][0].content
+    if state.get("best_docs") and state.get("best_score", 0.0) > relevance_grader.low:
+        response = answer_from_docs(question, state["best_docs"])
+    else:
+        response = llm.invoke([HumanMessage(content=question)])
+    return {"messages": [response], "budget_spent": budget_spent(state)}
 
 class grade(BaseModel):
     binary_score: str = Field(description="Relevance score 'yes' or 'no' ")
 
-def grade_documents(state:AgentState)->Literal["Output_Generator", "Query_Rewriter"]:
+def llm_grade_documents(state:AgentState)->Literal["generator", "rewriter"]:
     llm_with_structure_op=llm.with_structured_output(grade)
     
     prompt=PromptTemplate(
@@ -132,28 +171,95 @@ def grade_documents(state:AgentState)->Literal["Output_Generator", "Query_Rewrit
         print("---DECISION: DOCS NOT RELEVANT---")
         return "rewriter" #this should be a node name
 
-workflow=StateGraph(AgentState)
+def grade_documents(state:AgentState)->Literal["generator", "rewriter"]:
+    messages = state["messages"]
+    return relevance_grader.route(state, messages[0].content, messages[-1].content)
 
-workflow.add_node("ai_assistant", AI_Asisstant)
-retrieve=ToolNode([retriever_tool])
-workflow.add_node("retriever", retrieve)
-workflow.add_node("rewriter", rewrite)
-workflow.add_node("generator", generate)
+def build_graph(retriever_tool):
+    workflow=StateGraph(AgentState)
 
-workflow.add_edge(START, "ai_assistant")
-workflow.add_conditional_edges(
-    "ai_assistant", 
-    tools_condition,
-    {"tools": "retriever", END: END,}
-    )
-workflow.add_conditional_edges(
-    "retriever", 
-    grade_documents,
-    {"rewriter": "rewriter", "generator": "generator",}
+    workflow.add_node("ai_assistant", lambda state: AI_Asisstant(state, [retriever_tool]))
+    retrieve=ToolNode([retriever_tool])
+    workflow.add_node("retriever", retrieve)
+    workflow.add_node("rewriter", rewrite)
+    workflow.add_node("generator", generate)
+    workflow.add_node("budget_answer", budget_answer)
+
+    workflow.add_edge(START, "ai_assistant")
+    workflow.add_conditional_edges(
+        "ai_assistant", 
+        tools_condition,
+        {"tools": "retriever", END: END,}
+        )
+    workflow.add_conditional_edges(
+        "retriever", 
+        grade_documents,
+        {"rewriter": "rewriter", "generator": "generator",}
+        )
+    workflow.add_edge("generator", END)
+    workflow.add_conditional_edges(
+        "rewriter",
+        check_budget,
+        {"ai_assistant": "ai_assistant", "budget_answer": "budget_answer",}
+        )
+    workflow.add_edge("budget_answer", END)
+
+    return workflow.compile()
+
+def build():
+    """Load the models, sync the index and compile the graph. Returns the answer-cached graph."""
+    global embeddings, llm, rag_prompt, vectorstore, lexical_index, search_store, retriever, retriever_tool
+    global relevance_grader, context_packer, app, answer_cache, cached_app
+    #USER_AGENT=os.getenv("USER_AGENT")
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    #Batched, cached on disk by (model, text), optionally spread over RAG_EMBED_WORKERS processes
+    embeddings=CachedBatchEmbeddings(HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"), model_name="all-MiniLM-L6-v2")
+
+    llm = ChatGroq(model="llama-3.3-70b-versatile")
+
+    #Testing llm model
+    #print(llm.invoke("hello, how are you?"))
+
+    #Fetched concurrently and yielded as each page lands; unchanged pages come from the local HTTP cache
+    docs_stream = iter_documents(urls)
+    #Split in a process pool and streamed into the index in bounded batches
+    chunk_batches = iter_chunk_batches(docs_stream, chunk_size=100, chunk_overlap=5)
+
+    #Persistent index: only new or changed chunks get embedded on restart
+    #BM25 index kept next to the vector index and updated by the same sync
+    lexical_index=LexicalIndex()
+    vectorstore=sync_index_batches(chunk_batches, urls, embeddings, collection_name="rag-chrome", lexical_index=lexical_index)
+    embeddings.report()
+
+    if VECTOR_BACKEND == "mmap":
+        search_store = QuantizedVectorStore.open_or_build(vectorstore, read_index_version(), embedding=embeddings)
+    else:
+        search_store = vectorstore
+
+    #Dense and keyword results merged with reciprocal rank fusion
+    retriever = HybridRetriever(vectorstore=search_store, lexical_index=lexical_index)
+
+    retriever_tool = create_retriever_tool(
+        retriever,
+        "retrieve_blog_posts",
+        "Search these urls for soccer data and rules .You are a specialized assistant. Use the 'retriever_tool' **only** when the query explicitly relates soccer. For all other queries, respond directly without using any tool. For simple queries like 'hi', 'hello', or 'how are you', provide a normal response.",
+        document_separator=DOCUMENT_SEPARATOR,
     )
-workflow.add_edge("generator", END)
-workflow.add_edge("rewriter", "ai_assistant")
 
-app=workflow.compile()
+    #Pulled once instead of on every generate call
+    rag_prompt = hub.pull("rlm/rag-prompt")
+
+    #Local grading first; the LLM grader only runs for scores in the uncertain band
+    relevance_grader=RelevanceGrader(embeddings, fallback=llm_grade_documents)
+    context_packer=ContextPacker(embeddings)
+
+    app=build_graph(retriever_tool)
+
+    #Paraphrases of recently answered questions skip the graph; cleared whenever the index changes
+    answer_cache=SemanticAnswerCache(embeddings, version_fn=read_index_version)
+    cached_app=CachedGraph(app, answer_cache)
+    return cached_app
 
-print(app.invoke({"messages":["How do you make chocolate?"]}))
\ No newline at end of file
+if __name__ == "__main__":
+    print(build().invoke({"messages":["How do you make chocolate?"]}))
\ No newline at end of file
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+
+SIMILARITY_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.92"))
+TTL_SECONDS = float(os.getenv("RAG_ANSWER_CACHE_TTL", "3600"))
+MAX_ENTRIES = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "1000"))
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """
+    Maps question embeddings to final answers. A lookup hits when a stored question has cosine
+    similarity >= threshold with the new one. Entries expire after ttl_seconds, the least
+    recently used entry is evicted past max_entries, and everything is dropped when
+    version_fn() (the vector index version) changes.
+    """
+
+    def __init__(self, embeddings, threshold=SIMILARITY_THRESHOLD, ttl_seconds=TTL_SECONDS,
+                 max_entries=MAX_ENTRIES, version_fn=None):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self._version = version_fn() if version_fn else None
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _check_version(self):
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+            self.stats["invalidations"] += 1
+
+    def _expire(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry["stored_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, question):
+        """Return (answer or None, normalized question vector) so a miss can be stored without re-embedding."""
+        vector = _normalize(self.embeddings.embed_query(question))
+        with self._lock:
+            self._check_version()
+            self._expire(time.time())
+            best_key, best_score = None, -1.0
+            if self._entries:
+                keys = list(self._entries.keys())
+                scores = np.stack([self._entries[key]["vector"] for key in keys]) @ vector
+                best = int(np.argmax(scores))
+                best_key, best_score = keys[best], float(scores[best])
+            if best_key is not None and best_score >= self.threshold:
+                self._entries.move_to_end(best_key)
+                self.stats["hits"] += 1
+                print(f"---ANSWER CACHE HIT (similarity {best_score:.3f})---")
+                return self._entries[best_key]["answer"], vector
+            self.stats["misses"] += 1
+            return None, vector
+
+    def store(self, question, vector, answer):
+        with self._lock:
+            self._entries[self._next_key] = {
+                "question": question,
+                "vector": vector,
+                "answer": answer,
+                "stored_at": time.time(),
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+
+
+def question_from_inputs(inputs):
+    first = inputs["messages"][0]
+    if isinstance(first, tuple):
+        return first[1]
+    return first if isinstance(first, str) else first.content
+
+
+class CachedGraph:
+    """Drop-in wrapper for the compiled graph that answers near-duplicate questions from the cache."""
+
+    def __init__(self, app, cache):
+        self.app = app
+        self.cache = cache
+
+    def invoke(self, inputs, config=None, **kwargs):
+        question = question_from_inputs(inputs)
+        answer, vector = self.cache.lookup(question)
+        if answer is not None:
+            return {"messages": [HumanMessage(content=question), AIMessage(content=answer)], "cached": True}
+
+        result = self.app.invoke(inputs, config, **kwargs)
+        final_message = result["messages"][-1]
+        if isinstance(final_message, AIMessage) and final_message.content and not final_message.tool_calls:
+            self.cache.store(question, vector, final_message.content)
+        return result
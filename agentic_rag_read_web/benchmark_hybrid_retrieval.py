@@ -0,0 +1,53 @@
+"""
+Counts how many rewriter passes the graph needs on a fixed soccer question set with plain dense
+retrieval versus the hybrid BM25 + vector retriever. Run from this directory:
+
+    python benchmark_hybrid_retrieval.py
+"""
+import time
+
+from langchain.tools.retriever import create_retriever_tool
+from langgraph.errors import GraphRecursionError
+
+import agentic_rag
+from relevance_grader import DOCUMENT_SEPARATOR
+
+QUESTIONS = [
+    "What is the offside rule?",
+    "When is a player not offside?",
+    "What is an indirect free kick?",
+    "When does the referee award a penalty kick?",
+    "How long is a soccer match?",
+    "What happens after a yellow card?",
+    "How many players are on the field for each team?",
+    "What is a goal kick?",
+    "When is a throw-in taken?",
+    "What is a corner kick?",
+]
+RECURSION_LIMIT = 25
+
+
+def run(name, tool):
+    app = agentic_rag.build_graph(tool)
+    rewrites, failures = 0, 0
+    started = time.perf_counter()
+    for question in QUESTIONS:
+        try:
+            result = app.invoke({"messages": [question]}, {"recursion_limit": RECURSION_LIMIT})
+            rewrites += result.get("rewrites", 0)
+        except GraphRecursionError:
+            failures += 1
+    elapsed = time.perf_counter() - started
+    print(f"{name:>8}: {rewrites} rewrites, {failures} hit the recursion limit, {elapsed:.1f}s total")
+    return rewrites
+
+
+if __name__ == "__main__":
+    agentic_rag.build()
+    retriever_tool = agentic_rag.retriever_tool
+    dense_tool = create_retriever_tool(agentic_rag.search_store.as_retriever(), retriever_tool.name, retriever_tool.description,
+                                       document_separator=DOCUMENT_SEPARATOR)
+    dense_rewrites = run("dense", dense_tool)
+    hybrid_rewrites = run("hybrid", create_retriever_tool(agentic_rag.retriever, retriever_tool.name, retriever_tool.description,
+                                                          document_separator=DOCUMENT_SEPARATOR))
+    print(f"hybrid retrieval saved {dense_rewrites - hybrid_rewrites} rewrites over {len(QUESTIONS)} questions")
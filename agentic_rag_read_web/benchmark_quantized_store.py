@@ -0,0 +1,85 @@
+"""
+Recall@k vs latency of the memory-mapped quantized store against exact float32 search.
+
+    python benchmark_quantized_store.py --synthetic 1000000   # random 384-dim vectors
+    python benchmark_quantized_store.py                       # vectors from the persistent Chroma index
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from quantized_store import QuantizedVectorStore, _Writer, _normalize_rows
+
+DIM = 384
+WRITE_BATCH = 50000
+
+
+def synthetic_vectors(count, seed=0):
+    rng = np.random.default_rng(seed)
+    #Clustered data, closer to real sentence embeddings than isotropic noise
+    centers = rng.standard_normal((256, DIM)).astype(np.float32)
+    for start in range(0, count, WRITE_BATCH):
+        size = min(WRITE_BATCH, count - start)
+        yield centers[rng.integers(0, len(centers), size)] + 0.6 * rng.standard_normal((size, DIM)).astype(np.float32)
+
+
+def chroma_vectors():
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from vector_index import open_index
+    vectorstore = open_index(HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"))
+    offset = 0
+    while True:
+        batch = vectorstore.get(include=["embeddings"], limit=WRITE_BATCH, offset=offset)
+        if not len(batch["ids"]):
+            break
+        offset += len(batch["ids"])
+        yield np.asarray(batch["embeddings"], dtype=np.float32)
+
+
+def build(path, batches, quantization):
+    writer = _Writer(path, quantization)
+    for vectors in batches:
+        writer.add([""] * len(vectors), [""] * len(vectors), [{}] * len(vectors), vectors)
+    writer.close()
+    return QuantizedVectorStore(path)
+
+
+def exact_top_k(store, queries, k):
+    results = []
+    for query in queries:
+        scores = np.asarray(store.full) @ query
+        results.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="number of random vectors instead of the Chroma index")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for quantization in ("int8", "float16"):
+            batches = synthetic_vectors(args.synthetic) if args.synthetic else chroma_vectors()
+            store = build(os.path.join(tmp, quantization), batches, quantization)
+            count = store.meta["count"]
+            rng = np.random.default_rng(1)
+            rows = rng.integers(0, count, args.queries)
+            queries = _normalize_rows(np.asarray(store.full[rows]) + 0.1 * rng.standard_normal((args.queries, store.meta["dim"])))
+            truth = exact_top_k(store, queries, args.k)
+
+            for rerank_factor in (0, 2, 4, 8):
+                started = time.perf_counter()
+                found = [{row for row, _ in store.search_vector(query, args.k, rerank_factor)} for query in queries]
+                latency_ms = (time.perf_counter() - started) / len(queries) * 1000
+                recall = np.mean([len(f & t) / args.k for f, t in zip(found, truth)])
+                print(f"{quantization:>7} n={count} rerank x{rerank_factor}: recall@{args.k}={recall:.3f} "
+                      f"latency={latency_ms:.2f}ms/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import re
+
+import numpy as np
+import tiktoken
+
+from relevance_grader import split_retrieved
+
+TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKENS", "1500"))
+NEAR_DUPLICATE_JACCARD = float(os.getenv("RAG_NEAR_DUPLICATE_JACCARD", "0.8"))
+MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+#Same encoder RecursiveCharacterTextSplitter.from_tiktoken_encoder uses by default
+ENCODING_NAME = "gpt2"
+SHINGLE_SIZE = 3
+WORD_RE = re.compile(r"\w+")
+
+
+def _shingles(text):
+    words = WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class ContextPacker:
+    """
+    Turns the raw retriever output into the context string for the rag prompt: drops exact and
+    near-duplicate chunks, orders the rest by MMR against the question, and keeps adding chunks
+    until the token budget is full.
+    """
+
+    def __init__(self, embeddings, token_budget=TOKEN_BUDGET, near_duplicate=NEAR_DUPLICATE_JACCARD,
+                 mmr_lambda=MMR_LAMBDA):
+        self.embeddings = embeddings
+        self.token_budget = token_budget
+        self.near_duplicate = near_duplicate
+        self.mmr_lambda = mmr_lambda
+        self.encoding = tiktoken.get_encoding(ENCODING_NAME)
+
+    def deduplicate(self, chunks):
+        kept, kept_shingles, seen = [], [], set()
+        for chunk in chunks:
+            digest = hashlib.sha256(" ".join(WORD_RE.findall(chunk.lower())).encode("utf-8")).hexdigest()
+            if digest in seen:
+                continue
+            shingles = _shingles(chunk)
+            if any(_jaccard(shingles, other) >= self.near_duplicate for other in kept_shingles):
+                continue
+            seen.add(digest)
+            kept.append(chunk)
+            kept_shingles.append(shingles)
+        return kept
+
+    def mmr_order(self, question, chunks):
+        if len(chunks) < 2:
+            return chunks
+        vectors = np.asarray(self.embeddings.embed_documents(chunks), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        query = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        query /= max(np.linalg.norm(query), 1e-12)
+        relevance = vectors @ query
+        similarity = vectors @ vectors.T
+
+        selected, remaining = [], list(range(len(chunks)))
+        while remaining:
+            if selected:
+                redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+            else:
+                redundancy = np.zeros(len(remaining))
+            scores = self.mmr_lambda * relevance[remaining] - (1 - self.mmr_lambda) * redundancy
+            selected.append(remaining.pop(int(np.argmax(scores))))
+        return [chunks[i] for i in selected]
+
+    def count_tokens(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def pack(self, question, docs):
+        chunks = split_retrieved(docs)
+        raw_tokens = self.count_tokens(docs)
+        ordered = self.mmr_order(question, self.deduplicate(chunks))
+
+        packed, used = [], 0
+        for chunk in ordered:
+            tokens = self.count_tokens(chunk)
+            if used + tokens > self.token_budget:
+                continue
+            packed.append(chunk)
+            used += tokens
+
+        context = "\n\n".join(packed)
+        packed_tokens = self.count_tokens(context)
+        print(f"---CONTEXT PACKED: {len(packed)}/{len(chunks)} chunks, {packed_tokens}/{raw_tokens} tokens, "
+              f"{raw_tokens - packed_tokens} saved---")
+        return context
@@ -0,0 +1,197 @@
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+CACHE_PATH = os.getenv("RAG_EMBEDDING_CACHE", "rag_embedding_cache.sqlite")
+BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+WORKERS = int(os.getenv("RAG_EMBED_WORKERS", "0"))
+#SQLite caps the number of bound parameters per statement
+LOOKUP_CHUNK = 500
+#spawn, not fork: forking after torch has started its OpenMP threads can hang the children
+MP_CONTEXT = os.getenv("RAG_EMBED_MP_CONTEXT", "spawn")
+
+_worker_embeddings = None
+
+
+def worker_context():
+    """
+    Context for the chunking and embedding pools. Spawned workers re-import the launching script,
+    so scripts that start a pool keep their work under __main__ or in a function (agentic_rag.build).
+    """
+    return multiprocessing.get_context(MP_CONTEXT)
+
+
+def _init_worker(base):
+    global _worker_embeddings
+    _worker_embeddings = base
+
+
+def _embed_in_worker(texts):
+    return _worker_embeddings.embed_documents(texts)
+
+
+class QueryMicroBatcher:
+    """
+    Collects embed_query calls arriving from concurrent threads and embeds them with one
+    embed_documents call per window. Callers block until their batch is done.
+    """
+
+    def __init__(self, base, window_seconds=0.005, max_batch=64):
+        self.base = base
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._pending = []
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+        self.stats = {"queries": 0, "batches": 0}
+
+    def embed(self, text):
+        item = {"text": text, "done": threading.Event(), "vector": None, "error": None}
+        with self._cond:
+            self._pending.append(item)
+            self._cond.notify()
+        item["done"].wait()
+        if item["error"] is not None:
+            raise item["error"]
+        return item["vector"]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                #Give concurrent callers one window to join the batch
+                deadline = time.monotonic() + self.window_seconds
+                while len(self._pending) < self.max_batch and (remaining := deadline - time.monotonic()) > 0:
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            try:
+                #MiniLM embeds queries and documents the same way, so one documents call serves the batch
+                vectors = self.base.embed_documents([item["text"] for item in batch])
+                for item, vector in zip(batch, vectors):
+                    item["vector"] = vector
+            except Exception as err:
+                for item in batch:
+                    item["error"] = err
+            self.stats["queries"] += len(batch)
+            self.stats["batches"] += 1
+            for item in batch:
+                item["done"].set()
+
+
+class CachedBatchEmbeddings(Embeddings):
+    """
+    Wraps an embeddings object with batching, a content-addressed on-disk cache and an optional
+    process pool. Cache keys are sha256(model name + chunk text), so identical text is embedded
+    once no matter which page or run it comes from. With workers > 1, base is pickled to each
+    worker once, so its class must live in an importable module, not the launching script.
+    """
+
+    def __init__(self, base, model_name, cache_path=CACHE_PATH, batch_size=BATCH_SIZE, workers=WORKERS):
+        self.base = base
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.workers = workers
+        self._pool = None
+        self._query_batcher = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+        self.stats = {"requested": 0, "hits": 0, "embedded": 0, "embed_seconds": 0.0}
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys):
+        found = {}
+        unique = list(set(keys))
+        with self._lock:
+            for start in range(0, len(unique), LOOKUP_CHUNK):
+                part = unique[start:start + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part)
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def _store(self, items):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in items],
+            )
+            self._conn.commit()
+
+    def _embed_batches(self, texts):
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self.workers > 1 and len(batches) > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=worker_context(),
+                    initializer=_init_worker,
+                    initargs=(self.base,),
+                )
+            results = self._pool.map(_embed_in_worker, batches)
+        else:
+            results = (self.base.embed_documents(batch) for batch in batches)
+        vectors = []
+        for result in results:
+            vectors.extend(result)
+        return vectors
+
+    def embed_documents(self, texts):
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        started = time.perf_counter()
+        if missing:
+            vectors = self._embed_batches(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._store(computed.items())
+            found.update(computed)
+
+        self.stats["requested"] += len(texts)
+        self.stats["hits"] += len(texts) - len(missing)
+        self.stats["embedded"] += len(missing)
+        self.stats["embed_seconds"] += time.perf_counter() - started
+        return [found[key] for key in keys]
+
+    def enable_query_batching(self, window_seconds=0.005, max_batch=64):
+        """Used by long-running servers, where many requests embed their questions at the same time."""
+        self._query_batcher = QueryMicroBatcher(self.base, window_seconds, max_batch)
+        return self._query_batcher
+
+    def embed_query(self, text):
+        if self._query_batcher is not None:
+            return self._query_batcher.embed(text)
+        return self.base.embed_query(text)
+
+    def report(self):
+        requested = self.stats["requested"]
+        seconds = self.stats["embed_seconds"]
+        hit_rate = self.stats["hits"] / requested if requested else 0.0
+        rate = self.stats["embedded"] / seconds if seconds else 0.0
+        print(f"---EMBEDDINGS: {requested} chunks, {hit_rate:.1%} cache hits, "
+              f"{self.stats['embedded']} embedded at {rate:.1f} chunks/sec---")
+        return {**self.stats, "hit_rate": hit_rate, "chunks_per_sec": rate}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self._conn.close()
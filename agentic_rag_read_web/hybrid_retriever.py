@@ -0,0 +1,147 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from typing import Any, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from vector_index import INDEX_DIR, chunk_id
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from", "how", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when", "where", "which",
+    "who", "why", "with", "you", "your",
+}
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over the same chunk ids as the vector index, persisted in sqlite next to it.
+    Chunks are added and removed incrementally by sync_index, never rebuilt from scratch; text and
+    postings stay on disk and a search only reads the postings of the query terms.
+    """
+
+    def __init__(self, path=os.path.join(INDEX_DIR, "lexical_index.sqlite"), k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, source TEXT, text TEXT, metadata TEXT, length INTEGER);
+            CREATE INDEX IF NOT EXISTS docs_by_source ON docs (source);
+            CREATE TABLE IF NOT EXISTS postings (term TEXT, id TEXT, tf INTEGER, PRIMARY KEY (term, id)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_by_id ON postings (id);
+        """)
+        self._conn.commit()
+
+    def __contains__(self, doc_id):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM docs WHERE id = ?", (doc_id,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def source_ids(self, source):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM docs WHERE source = ?", (source,))]
+
+    def ids_not_from(self, sources):
+        sources = list(sources)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                f"SELECT id FROM docs WHERE source NOT IN ({','.join('?' * len(sources))})", sources)]
+
+    def add(self, doc_id, document):
+        tokens = tokenize(document.page_content)
+        with self._lock:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO docs (id, source, text, metadata, length) VALUES (?, ?, ?, ?, ?)",
+                (doc_id, document.metadata.get("source", ""), document.page_content, json.dumps(document.metadata),
+                 len(tokens))).rowcount
+            if inserted:
+                self._conn.executemany("INSERT INTO postings (term, id, tf) VALUES (?, ?, ?)",
+                                       [(term, doc_id, count) for term, count in Counter(tokens).items()])
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM postings WHERE id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+    def save(self):
+        with self._lock:
+            self._conn.commit()
+
+    def search(self, query, k=20):
+        """Return [(doc_id, score)] for the top k chunks by BM25."""
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            n, total_length = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+            if not n:
+                return []
+            placeholders = ",".join("?" * len(terms))
+            rows = self._conn.execute(
+                f"SELECT p.term, p.id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.id "
+                f"WHERE p.term IN ({placeholders})", terms).fetchall()
+        avg_length = total_length / n or 1.0
+        postings = defaultdict(list)
+        for term, doc_id, count, length in rows:
+            postings[term].append((doc_id, count, length))
+        scores = defaultdict(float)
+        for term, entries in postings.items():
+            idf = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+            for doc_id, count, length in entries:
+                scores[doc_id] += idf * count * (self.k1 + 1) / (
+                    count + self.k1 * (1 - self.b + self.b * length / avg_length))
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def document(self, doc_id):
+        with self._lock:
+            text, metadata = self._conn.execute("SELECT text, metadata FROM docs WHERE id = ?", (doc_id,)).fetchone()
+        return Document(page_content=text, metadata=json.loads(metadata))
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] += 1.0 / (rrf_k + rank + 1)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense top-k from the vector store fused with BM25 top-k using reciprocal rank fusion."""
+
+    vectorstore: Any
+    lexical_index: Any
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        documents = {}
+        dense_ranking = []
+        for doc in self.vectorstore.similarity_search(query, k=self.fetch_k):
+            #Chunk ids are derived from source and content, so both indexes agree on them
+            doc_id = chunk_id(doc.metadata.get("source", ""), doc.page_content)
+            documents.setdefault(doc_id, doc)
+            dense_ranking.append(doc_id)
+
+        lexical_ranking = [doc_id for doc_id, _ in self.lexical_index.search(query, k=self.fetch_k)]
+        fused = reciprocal_rank_fusion([dense_ranking, lexical_ranking], self.rrf_k)[:self.k]
+        return [documents[doc_id] if doc_id in documents else self.lexical_index.document(doc_id) for doc_id in fused]
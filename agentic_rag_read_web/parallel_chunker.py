@@ -0,0 +1,76 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from embedding_engine import worker_context
+
+CHUNK_WORKERS = int(os.getenv("RAG_CHUNK_WORKERS", str(os.cpu_count() or 1)))
+CHUNK_BATCH_SIZE = int(os.getenv("RAG_CHUNK_BATCH_SIZE", "512"))
+#Documents handed to a worker per task; small enough to keep memory flat, big enough to amortize pickling
+DOCS_PER_TASK = 8
+
+_worker_splitter = None
+
+
+def _make_splitter(chunk_size, chunk_overlap):
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def _init_worker(chunk_size, chunk_overlap):
+    global _worker_splitter
+    _worker_splitter = _make_splitter(chunk_size, chunk_overlap)
+
+
+def _split_in_worker(documents):
+    return _worker_splitter.split_documents(documents)
+
+
+def _groups(documents, size):
+    group = []
+    for document in documents:
+        group.append(document)
+        if len(group) == size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def iter_chunk_batches(documents, chunk_size=100, chunk_overlap=5, batch_size=CHUNK_BATCH_SIZE, workers=CHUNK_WORKERS):
+    """
+    Split an iterable of documents in a process pool and yield lists of at most batch_size chunks.
+    Only workers * 2 tasks are in flight at a time, so documents are pulled from the iterable as
+    the pool frees up and peak memory follows the batch size, not the corpus size.
+    """
+    batch = []
+
+    def emit(chunks):
+        nonlocal batch
+        batch.extend(chunks)
+        while len(batch) >= batch_size:
+            ready, batch = batch[:batch_size], batch[batch_size:]
+            yield ready
+
+    if workers <= 1:
+        splitter = _make_splitter(chunk_size, chunk_overlap)
+        for group in _groups(documents, DOCS_PER_TASK):
+            yield from emit(splitter.split_documents(group))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=worker_context(),
+            initializer=_init_worker,
+            initargs=(chunk_size, chunk_overlap),
+        ) as pool:
+            in_flight = deque()
+            for group in _groups(documents, DOCS_PER_TASK):
+                in_flight.append(pool.submit(_split_in_worker, group))
+                if len(in_flight) >= workers * 2:
+                    yield from emit(in_flight.popleft().result())
+            while in_flight:
+                yield from emit(in_flight.popleft().result())
+
+    if batch:
+        yield batch
@@ -0,0 +1,242 @@
+import contextlib
+import fcntl
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+MMAP_INDEX_DIR = os.getenv("RAG_MMAP_INDEX_DIR", "rag_mmap_index")
+#int8 or float16
+QUANTIZATION = os.getenv("RAG_MMAP_QUANTIZATION", "int8")
+#Candidates re-scored with exact float32 vectors = k * RERANK_FACTOR; 0 disables the re-rank
+RERANK_FACTOR = int(os.getenv("RAG_MMAP_RERANK_FACTOR", "4"))
+#Rows scored per matrix product, bounds the temporary float32 buffer during a scan
+SCAN_BLOCK = 65536
+EXPORT_BATCH = 5000
+
+
+def _normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _quantize(vectors, quantization):
+    if quantization == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales
+
+
+@contextlib.contextmanager
+def _build_lock(path):
+    """Exclusive lock on a sibling file, so concurrent workers build and swap a snapshot one at a time."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class _Writer:
+    """Appends vectors and documents to a new snapshot directory, batch by batch."""
+
+    def __init__(self, path, quantization):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.quantization = quantization
+        self.count = 0
+        self.dim = None
+        self._quantized = open(os.path.join(path, "vectors.q"), "wb")
+        self._full = open(os.path.join(path, "vectors.f32"), "wb")
+        self._scales = open(os.path.join(path, "scales.f32"), "wb")
+        self._docs = sqlite3.connect(os.path.join(path, "docs.sqlite"))
+        self._docs.execute("CREATE TABLE docs (row INTEGER PRIMARY KEY, id TEXT, text TEXT, metadata TEXT)")
+
+    def add(self, ids, texts, metadatas, vectors):
+        vectors = _normalize_rows(vectors)
+        self.dim = vectors.shape[1]
+        quantized, scales = _quantize(vectors, self.quantization)
+        self._quantized.write(quantized.tobytes())
+        self._full.write(vectors.tobytes())
+        self._scales.write(scales.tobytes())
+        self._docs.executemany(
+            "INSERT INTO docs (row, id, text, metadata) VALUES (?, ?, ?, ?)",
+            [(self.count + i, doc_id, text, json.dumps(metadata or {}))
+             for i, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas))],
+        )
+        self.count += len(vectors)
+
+    def close(self, extra_meta=None):
+        for f in (self._quantized, self._full, self._scales):
+            f.close()
+        self._docs.commit()
+        self._docs.close()
+        meta = {"count": self.count, "dim": self.dim or 0, "quantization": self.quantization, **(extra_meta or {})}
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+
+class QuantizedVectorStore(VectorStore):
+    """
+    Read-only vector store over a snapshot directory of memory-mapped files. Quantized vectors are
+    scanned with blocked matrix products; the top candidates are optionally re-scored against the
+    exact float32 vectors. All files are opened read-only, so worker processes share the pages
+    through the OS page cache instead of each holding its own copy.
+    """
+
+    def __init__(self, path=MMAP_INDEX_DIR, embedding=None, rerank_factor=RERANK_FACTOR):
+        self.path = path
+        self.embedding = embedding
+        self.rerank_factor = rerank_factor
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        count, dim = self.meta["count"], self.meta["dim"]
+        dtype = np.float16 if self.meta["quantization"] == "float16" else np.int8
+        shape = (count, dim)
+        self.quantized = np.memmap(os.path.join(path, "vectors.q"), dtype=dtype, mode="r", shape=shape) if count else np.zeros(shape, dtype)
+        self.full = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r", shape=shape) if count else np.zeros(shape, np.float32)
+        self.scales = np.memmap(os.path.join(path, "scales.f32"), dtype=np.float32, mode="r", shape=(count,)) if count else np.zeros(0, np.float32)
+        #Opened now, next to the memmaps: a later swap renames the directory, but these handles keep
+        #reading the snapshot they were opened on, so text and vectors always come from the same build
+        uri = f"file:{os.path.abspath(os.path.join(path, 'docs.sqlite'))}?mode=ro&immutable=1"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    @staticmethod
+    def _swap_in(tmp_path, path):
+        #Rename instead of rewriting in place: workers that still map the old files keep valid pages.
+        #Callers hold _build_lock, so no other worker is renaming at the same time
+        old_path = f"{path}.old-{os.getpid()}"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def build_from_chroma(cls, chroma, path=MMAP_INDEX_DIR, quantization=QUANTIZATION, embedding=None, index_version=None):
+        with _build_lock(path):
+            return cls._build_from_chroma(chroma, path, quantization, embedding, index_version)
+
+    @classmethod
+    def _build_from_chroma(cls, chroma, path, quantization, embedding, index_version):
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        writer = _Writer(tmp_path, quantization)
+        offset = 0
+        while True:
+            batch = chroma.get(include=["embeddings", "documents", "metadatas"], limit=EXPORT_BATCH, offset=offset)
+            if not len(batch["ids"]):
+                break
+            writer.add(batch["ids"], batch["documents"], batch["metadatas"], batch["embeddings"])
+            offset += len(batch["ids"])
+        writer.close({"index_version": index_version})
+        cls._swap_in(tmp_path, path)
+        print(f"---MMAP INDEX: {writer.count} vectors exported as {quantization}---")
+        return cls(path, embedding=embedding)
+
+    @classmethod
+    def open_or_build(cls, chroma, index_version, path=MMAP_INDEX_DIR, quantization=QUANTIZATION, embedding=None):
+        """Reuse the snapshot while it matches the vector index version, otherwise re-export it."""
+        store = cls._open_current(path, index_version, quantization, embedding)
+        if store is not None:
+            return store
+        with _build_lock(path):
+            #Another worker may have rebuilt it while this one waited for the lock
+            store = cls._open_current(path, index_version, quantization, embedding)
+            return store or cls._build_from_chroma(chroma, path, quantization, embedding, index_version)
+
+    @classmethod
+    def _open_current(cls, path, index_version, quantization, embedding):
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("index_version") == index_version and meta.get("quantization") == quantization:
+                return cls(path, embedding=embedding)
+        except (OSError, ValueError, sqlite3.Error):
+            pass
+        return None
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding, metadatas: Optional[List[dict]] = None, ids=None,
+                   path=MMAP_INDEX_DIR, quantization=QUANTIZATION, **kwargs: Any) -> "QuantizedVectorStore":
+        texts = list(texts)
+        vectors = embedding.embed_documents(texts)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with _build_lock(path):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            writer = _Writer(tmp_path, quantization)
+            writer.add(ids or [str(i) for i in range(len(texts))], texts, metadatas or [{}] * len(texts), vectors)
+            writer.close()
+            cls._swap_in(tmp_path, path)
+        return cls(path, embedding=embedding)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("QuantizedVectorStore is a read-only snapshot; rebuild it from the Chroma index")
+
+    def search_vector(self, query, k=4, rerank_factor=None):
+        """Return [(row, cosine score)] for the top k rows."""
+        count = self.meta["count"]
+        if not count:
+            return []
+        query = _normalize_rows([query])[0]
+        rerank_factor = self.rerank_factor if rerank_factor is None else rerank_factor
+        candidates = min(count, k * rerank_factor if rerank_factor else k)
+
+        best_rows, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        for start in range(0, count, SCAN_BLOCK):
+            block = np.asarray(self.quantized[start:start + SCAN_BLOCK], dtype=np.float32)
+            scores = (block @ query) * self.scales[start:start + SCAN_BLOCK]
+            top = min(candidates, len(scores))
+            local = np.argpartition(-scores, top - 1)[:top]
+            best_rows = np.concatenate([best_rows, local + start])
+            best_scores = np.concatenate([best_scores, scores[local]])
+            if len(best_rows) > candidates:
+                keep = np.argpartition(-best_scores, candidates - 1)[:candidates]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+
+        if rerank_factor:
+            order = np.sort(best_rows)
+            best_rows, best_scores = order, self.full[order] @ query
+        top = np.argsort(-best_scores)[:k]
+        return [(int(best_rows[i]), float(best_scores[i])) for i in top]
+
+    def _documents(self, rows):
+        placeholders = ",".join("?" * len(rows))
+        with self._lock:
+            found = {row: (text, metadata) for row, text, metadata in
+                     self._conn.execute(f"SELECT row, text, metadata FROM docs WHERE row IN ({placeholders})", rows)}
+        return [Document(page_content=found[row][0], metadata=json.loads(found[row][1])) for row in rows]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        hits = self.search_vector(embedding, k)
+        if not hits:
+            return []
+        documents = self._documents([row for row, _ in hits])
+        return [(doc, score) for doc, (_, score) in zip(documents, hits)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
@@ -0,0 +1,93 @@
+"""
+Long-running HTTP service for the agentic RAG graph. The index, models and compiled graph are
+loaded once at startup; each request runs the graph through the async API and streams the
+generator's tokens back as they are produced.
+
+    python rag_service.py
+    curl -N -X POST localhost:8080/ask -d '{"question": "What is the offside rule?"}'
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from langchain_core.messages import AIMessage
+
+#agentic_rag.build() loads the index, embeddings, LLM clients and graph exactly once, at startup
+import agentic_rag
+from answer_cache import question_from_inputs
+
+HOST = os.getenv("RAG_SERVICE_HOST", "0.0.0.0")
+PORT = int(os.getenv("RAG_SERVICE_PORT", "8080"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("RAG_SERVICE_CONCURRENCY", "32"))
+EMBED_BATCH_WINDOW_SECONDS = float(os.getenv("RAG_EMBED_BATCH_WINDOW", "0.005"))
+#Nodes that produce the user-facing answer; their tokens are streamed
+ANSWER_NODES = {"generator", "budget_answer"}
+
+
+def final_answer(state):
+    message = state["messages"][-1]
+    return message.content if isinstance(message, AIMessage) else ""
+
+
+async def ask(request):
+    payload = await request.json()
+    question = payload.get("question", "").strip()
+    if not question:
+        return web.json_response({"error": "question is required"}, status=400)
+
+    response = web.StreamResponse(headers={"Content-Type": "text/plain; charset=utf-8"})
+    await response.prepare(request)
+
+    inputs = {"messages": [question]}
+    cached, vector = await asyncio.to_thread(agentic_rag.answer_cache.lookup, question_from_inputs(inputs))
+    if cached is not None:
+        await response.write(cached.encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    async with request.app["limiter"]:
+        streamed, final_state = False, None
+        async for event in agentic_rag.app.astream_events(inputs, version="v2"):
+            kind = event["event"]
+            if kind == "on_chat_model_stream" and event["metadata"].get("langgraph_node") in ANSWER_NODES:
+                token = event["data"]["chunk"].content
+                if token:
+                    streamed = True
+                    await response.write(token.encode("utf-8"))
+            elif kind == "on_chain_end" and not event["parent_ids"]:
+                final_state = event["data"]["output"]
+
+    answer = final_answer(final_state) if final_state else ""
+    #Direct replies from ai_assistant are not streamed token by token; send them whole
+    if not streamed and answer:
+        await response.write(answer.encode("utf-8"))
+    if answer:
+        agentic_rag.answer_cache.store(question, vector, answer)
+    await response.write_eof()
+    return response
+
+
+async def health(request):
+    return web.json_response({"status": "ok"})
+
+
+async def on_startup(app):
+    loop = asyncio.get_running_loop()
+    #Sync graph nodes run in the default executor; size it to the request concurrency
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS * 2))
+    app["limiter"] = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    agentic_rag.embeddings.enable_query_batching(EMBED_BATCH_WINDOW_SECONDS)
+
+
+def create_app():
+    app = web.Application()
+    app.on_startup.append(on_startup)
+    app.router.add_post("/ask", ask)
+    app.router.add_get("/health", health)
+    return app
+
+
+if __name__ == "__main__":
+    agentic_rag.build()
+    web.run_app(create_app(), host=HOST, port=PORT)
@@ -0,0 +1,76 @@
+import math
+import os
+
+import numpy as np
+
+#llm: always ask the LLM grader, embedding: cosine similarity, cross_encoder: local cross-encoder
+GRADER_MODE = os.getenv("RAG_GRADER_MODE", "embedding")
+CROSS_ENCODER_MODEL = os.getenv("RAG_CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+#Scores between low and high are the uncertain band that falls back to the LLM grader
+DEFAULT_THRESHOLDS = {
+    "embedding": (0.25, 0.5),
+    "cross_encoder": (0.2, 0.7),
+}
+
+
+#Passed to create_retriever_tool so retrieved chunks can be split apart again; page text from
+#get_text() is full of blank lines, so the default "\n\n" would cut chunks into paragraphs
+DOCUMENT_SEPARATOR = "\n\n<<<END OF CHUNK>>>\n\n"
+
+
+def split_retrieved(text):
+    return [part.strip() for part in text.split(DOCUMENT_SEPARATOR) if part.strip()]
+
+
+class RelevanceGrader:
+    """
+    Decides "generator" vs "rewriter" from the best local relevance score of the retrieved chunks.
+    Only scores inside the uncertain band are sent to `fallback`, the LLM grading function.
+    """
+
+    def __init__(self, embeddings, fallback, mode=GRADER_MODE, low=None, high=None):
+        self.embeddings = embeddings
+        self.fallback = fallback
+        self.mode = mode
+        default_low, default_high = DEFAULT_THRESHOLDS.get(mode, (0.0, 1.0))
+        self.low = float(os.getenv("RAG_GRADER_LOW", default_low)) if low is None else low
+        self.high = float(os.getenv("RAG_GRADER_HIGH", default_high)) if high is None else high
+        self._cross_encoder = None
+        self.stats = {"graded": 0, "fallbacks": 0}
+
+    def score(self, question, docs):
+        chunks = split_retrieved(docs)
+        if not chunks:
+            return 0.0
+        if self.mode == "cross_encoder":
+            if self._cross_encoder is None:
+                from sentence_transformers import CrossEncoder
+                self._cross_encoder = CrossEncoder(CROSS_ENCODER_MODEL)
+            logits = self._cross_encoder.predict([(question, chunk) for chunk in chunks])
+            return max(1.0 / (1.0 + math.exp(-float(logit))) for logit in logits)
+
+        question_vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        chunk_vectors = np.asarray(self.embeddings.embed_documents(chunks), dtype=np.float32)
+        norms = np.linalg.norm(chunk_vectors, axis=1) * np.linalg.norm(question_vector)
+        similarities = (chunk_vectors @ question_vector) / np.where(norms == 0, 1.0, norms)
+        return float(similarities.max())
+
+    def route(self, state, question, docs):
+        self.stats["graded"] += 1
+        if self.mode == "llm":
+            self.stats["fallbacks"] += 1
+            return self.fallback(state)
+
+        score = self.score(question, docs)
+        if score >= self.high:
+            print(f"---DECISION: DOCS RELEVANT (score {score:.3f})---")
+            return "generator"
+        if score <= self.low:
+            print(f"---DECISION: DOCS NOT RELEVANT (score {score:.3f})---")
+            return "rewriter"
+
+        self.stats["fallbacks"] += 1
+        print(f"---GRADER: score {score:.3f} uncertain, LLM fallback "
+              f"{self.stats['fallbacks']}/{self.stats['graded']} "
+              f"({self.stats['fallbacks'] / self.stats['graded']:.1%})---")
+        return self.fallback(state)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import time
+
+from langchain_community.vectorstores import Chroma
+
+#Where the on-disk Chroma collection lives, relative to where the script is run
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", "rag_index")
+ADD_BATCH_SIZE = 1000
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Stable id for a chunk: the same text from the same url always maps to the same id."""
+    return hashlib.sha256(f"{source}\0{content_hash(text)}".encode("utf-8")).hexdigest()
+
+
+def _version_path(persist_directory):
+    return os.path.join(persist_directory, "index_version.json")
+
+
+def read_index_version(persist_directory=INDEX_DIR):
+    """Counter bumped on every sync that changes the collection; caches compare against it."""
+    try:
+        with open(_version_path(persist_directory), encoding="utf-8") as f:
+            return json.load(f)["version"]
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def _bump_index_version(persist_directory):
+    version = read_index_version(persist_directory) + 1
+    os.makedirs(persist_directory, exist_ok=True)
+    tmp_path = _version_path(persist_directory) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "updated_at": time.time()}, f)
+    os.replace(tmp_path, _version_path(persist_directory))
+    return version
+
+
+def open_index(embeddings, collection_name="rag-chrome", persist_directory=INDEX_DIR):
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings,
+        persist_directory=persist_directory,
+    )
+
+
+def sync_index(doc_splits, urls, embeddings, collection_name="rag-chrome", persist_directory=INDEX_DIR,
+               lexical_index=None):
+    return sync_index_batches([doc_splits], urls, embeddings, collection_name, persist_directory, lexical_index)
+
+
+def sync_index_batches(chunk_batches, urls, embeddings, collection_name="rag-chrome", persist_directory=INDEX_DIR,
+                       lexical_index=None):
+    """
+    Bring the persistent collection in line with freshly split documents, consumed batch by batch.
+
+    Only chunks whose (source, content hash) is not stored yet get embedded. Stored chunks
+    that no longer appear on their page, or whose page was dropped from `urls`, are deleted.
+    Pages that are still listed but failed to load this run keep their old chunks.
+    When a lexical_index is given it receives the same adds and removes and is saved.
+
+    Stored ids are looked up per batch, and a page is reconciled as soon as a batch arrives
+    without it, so memory holds one batch plus the chunk ids of the pages in it. iter_chunk_batches
+    keeps document order, so a page's chunks arrive together; if they did not, a page closed early
+    would only have its late chunks added back (their embeddings come from the cache).
+    """
+    vectorstore = open_index(embeddings, collection_name, persist_directory)
+    counts = {"embedded": 0, "removed": 0, "reused": 0}
+    open_pages = {}
+
+    def delete(ids):
+        for start in range(0, len(ids), ADD_BATCH_SIZE):
+            vectorstore.delete(ids=ids[start:start + ADD_BATCH_SIZE])
+        counts["removed"] += len(ids)
+
+    def close_page(source, seen):
+        stored = vectorstore.get(where={"source": source}, include=[])["ids"]
+        delete([i for i in stored if i not in seen])
+        if lexical_index is not None:
+            for doc_id in lexical_index.source_ids(source):
+                if doc_id not in seen:
+                    lexical_index.remove(doc_id)
+            lexical_index.save()
+
+    for batch in chunk_batches:
+        wanted = {}
+        for doc in batch:
+            source = doc.metadata.get("source", "")
+            doc.metadata["content_hash"] = content_hash(doc.page_content)
+            doc_id = chunk_id(source, doc.page_content)
+            seen = open_pages.setdefault(source, set())
+            if doc_id not in seen:
+                seen.add(doc_id)
+                wanted[doc_id] = doc
+
+        stored = set(vectorstore.get(ids=list(wanted), include=[])["ids"]) if wanted else set()
+        new_ids = [i for i in wanted if i not in stored]
+        for start in range(0, len(new_ids), ADD_BATCH_SIZE):
+            part = new_ids[start:start + ADD_BATCH_SIZE]
+            vectorstore.add_documents([wanted[i] for i in part], ids=part)
+        counts["embedded"] += len(new_ids)
+        counts["reused"] += len(stored)
+
+        if lexical_index is not None:
+            for doc_id, doc in wanted.items():
+                if doc_id not in lexical_index:
+                    lexical_index.add(doc_id, doc)
+
+        batch_sources = {doc.metadata.get("source", "") for doc in batch}
+        for source in [s for s in open_pages if s not in batch_sources]:
+            close_page(source, open_pages.pop(source))
+
+    for source, seen in open_pages.items():
+        close_page(source, seen)
+
+    #Pages dropped from the url list; an empty list drops everything
+    unlisted = {"source": {"$nin": list(urls)}} if urls else None
+    delete(vectorstore.get(where=unlisted, include=[])["ids"])
+    if lexical_index is not None:
+        for doc_id in lexical_index.ids_not_from(urls):
+            lexical_index.remove(doc_id)
+        lexical_index.save()
+
+    if counts["removed"] or counts["embedded"]:
+        _bump_index_version(persist_directory)
+
+    print(f"---INDEX SYNC: {counts['embedded']} embedded, {counts['removed']} removed, "
+          f"{counts['reused']} reused---")
+    return vectorstore
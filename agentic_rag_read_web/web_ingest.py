@@ -0,0 +1,291 @@
+"""
+Concurrent page fetching with an on-disk HTTP cache (ETag / Last-Modified revalidation) and a
+per-host concurrency and spacing limit.
+
+    python web_ingest.py    # self-check against a local aiohttp.web stand-in
+"""
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+
+CACHE_DIR = os.getenv("RAG_HTTP_CACHE_DIR", "rag_http_cache")
+MAX_CONCURRENCY = int(os.getenv("RAG_FETCH_CONCURRENCY", "16"))
+PER_HOST_CONCURRENCY = int(os.getenv("RAG_FETCH_PER_HOST", "2"))
+PER_HOST_DELAY = float(os.getenv("RAG_FETCH_HOST_DELAY", "0.25"))
+TIMEOUT_SECONDS = float(os.getenv("RAG_FETCH_TIMEOUT", "30"))
+
+
+class HttpCache:
+    """
+    On-disk cache of fetched pages. Each url gets a body file and a small json file with the
+    validators (ETag / Last-Modified) needed for a conditional request next time.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.html")
+
+    def get(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, encoding="utf-8") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def put(self, url, body, etag=None, last_modified=None):
+        meta_path, body_path = self._paths(url)
+        meta = {"url": url, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+        #Write to temp files first so a crash never leaves a body without its validators
+        for path, data in ((body_path, body), (meta_path, json.dumps(meta))):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+
+class HostLimiter:
+    """Caps concurrent requests per host and spaces out request starts to the same host."""
+
+    def __init__(self, per_host=PER_HOST_CONCURRENCY, delay=PER_HOST_DELAY):
+        self.per_host = per_host
+        self.delay = delay
+        self._semaphores = {}
+        self._locks = {}
+        self._last_start = {}
+
+    async def __call__(self, host):
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+            self._locks[host] = asyncio.Lock()
+        semaphore = self._semaphores[host]
+        await semaphore.acquire()
+        async with self._locks[host]:
+            wait = self._last_start.get(host, 0.0) + self.delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_start[host] = time.monotonic()
+        return semaphore
+
+
+def html_to_document(url, html):
+    #Same text and metadata WebBaseLoader produces, so downstream chunk ids stay stable
+    soup = BeautifulSoup(html, "html.parser")
+    metadata = {"source": url}
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html_tag := soup.find("html"):
+        metadata["language"] = html_tag.get("lang", "No language found.")
+    return Document(page_content=soup.get_text(), metadata=metadata)
+
+
+async def _fetch_one(session, url, cache, limiter, stats):
+    meta, cached_body = cache.get(url)
+    headers = cache.conditional_headers(meta) if cached_body is not None else {}
+    semaphore = await limiter(urlsplit(url).netloc)
+    try:
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and cached_body is not None:
+                stats["not_modified"] += 1
+                return html_to_document(url, cached_body)
+            response.raise_for_status()
+            body = await response.text(errors="replace")
+            cache.put(url, body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            stats["downloaded"] += 1
+            return html_to_document(url, body)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+        stats["failed"] += 1
+        print(f"---FETCH FAILED: {url} ({err!r})---")
+        return None
+    finally:
+        semaphore.release()
+
+
+@contextlib.asynccontextmanager
+async def _fetch_session(cache_dir, max_concurrency, per_host, host_delay):
+    cache = HttpCache(cache_dir)
+    limiter = HostLimiter(per_host, host_delay)
+    stats = {"downloaded": 0, "not_modified": 0, "failed": 0}
+    headers = {}
+    if os.getenv("USER_AGENT"):
+        headers["User-Agent"] = os.getenv("USER_AGENT")
+
+    connector = aiohttp.TCPConnector(limit=max_concurrency, limit_per_host=per_host)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT_SECONDS)
+    started = time.perf_counter()
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            yield lambda url: _fetch_one(session, url, cache, limiter, stats)
+    finally:
+        print(f"---FETCH: {stats['downloaded']} downloaded, {stats['not_modified']} unchanged, "
+              f"{stats['failed']} failed in {time.perf_counter() - started:.2f}s---")
+
+
+async def afetch_documents(urls, cache_dir=CACHE_DIR, max_concurrency=MAX_CONCURRENCY,
+                           per_host=PER_HOST_CONCURRENCY, host_delay=PER_HOST_DELAY):
+    """
+    Fetch every url concurrently over one pooled session and return a Document per page that
+    loaded, in url order. Pages whose cached copy is still valid (HTTP 304) are served from disk.
+    """
+    async with _fetch_session(cache_dir, max_concurrency, per_host, host_delay) as fetch:
+        results = await asyncio.gather(*(fetch(url) for url in urls))
+    return [doc for doc in results if doc is not None]
+
+
+async def aiter_documents(urls, cache_dir=CACHE_DIR, max_concurrency=MAX_CONCURRENCY,
+                          per_host=PER_HOST_CONCURRENCY, host_delay=PER_HOST_DELAY):
+    """
+    Like afetch_documents, but yield each Document as soon as it loads. At most max_concurrency
+    pages are in flight or waiting to be consumed, so a slow consumer holds the fetching back
+    instead of the whole corpus piling up in memory.
+    """
+    urls = iter(urls)
+    async with _fetch_session(cache_dir, max_concurrency, per_host, host_delay) as fetch:
+        pending = set()
+        try:
+            while True:
+                pending.update(asyncio.ensure_future(fetch(url))
+                               for url in itertools.islice(urls, max_concurrency - len(pending)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result() is not None:
+                        yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+def fetch_documents(urls, **kwargs):
+    return asyncio.run(afetch_documents(urls, **kwargs))
+
+
+def iter_documents(urls, **kwargs):
+    """
+    Blocking iterator over aiter_documents for synchronous callers such as iter_chunk_batches.
+    The event loop runs in a background thread and stays at most max_concurrency pages ahead.
+    """
+    pages = queue.Queue(maxsize=kwargs.get("max_concurrency", MAX_CONCURRENCY))
+    stop = threading.Event()
+    finished = object()
+    failure = []
+
+    def offer(item):
+        #Give up once the consumer has gone away, so the thread never blocks on a full queue
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    async def produce():
+        async for doc in aiter_documents(urls, **kwargs):
+            if not await asyncio.to_thread(offer, doc):
+                return
+
+    def run():
+        try:
+            asyncio.run(produce())
+        except Exception as err:
+            failure.append(err)
+        finally:
+            offer(finished)
+
+    thread = threading.Thread(target=run, name="web-ingest", daemon=True)
+    thread.start()
+    try:
+        while (item := pages.get()) is not finished:
+            yield item
+        if failure:
+            raise failure[0]
+    finally:
+        stop.set()
+        thread.join()
+
+
+async def _self_check():
+    import tempfile
+    from aiohttp import web
+
+    in_flight, peak, starts, served = {}, {}, {}, {"200": 0, "304": 0}
+
+    async def page(request):
+        host = request.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        starts.setdefault(host, []).append(time.monotonic())
+        try:
+            await asyncio.sleep(0.05)
+            name = request.match_info["name"]
+            etag = f'"{name}-v1"'
+            if request.headers.get("If-None-Match") == etag:
+                served["304"] += 1
+                return web.Response(status=304, headers={"ETag": etag})
+            served["200"] += 1
+            return web.Response(text=f"<html lang='en'><title>{name}</title><p>Page {name}</p></html>",
+                                content_type="text/html", headers={"ETag": etag})
+        finally:
+            in_flight[host] -= 1
+
+    app = web.Application()
+    app.router.add_get("/{name}", page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    #Two host names for one server, so the per-host limit is checked per netloc
+    urls = [f"http://{host}:{port}/p{i}" for host in ("127.0.0.1", "localhost") for i in range(6)]
+    cache_dir = tempfile.mkdtemp()
+    try:
+        first = await afetch_documents(urls, cache_dir=cache_dir, per_host=2, host_delay=0.02)
+        assert len(first) == len(urls) and served["200"] == len(urls), served
+        assert first[0].metadata == {"source": urls[0], "title": "p0", "language": "en"}, first[0].metadata
+        assert max(peak.values()) <= 2, peak
+        for times in starts.values():
+            gaps = [b - a for a, b in zip(times, times[1:])]
+            assert min(gaps) >= 0.015, gaps
+        second = await afetch_documents(urls, cache_dir=cache_dir, per_host=2, host_delay=0.02)
+        assert served["304"] == len(urls) and [d.page_content for d in second] == [d.page_content for d in first], served
+        #Streaming yields in completion order; run it off the loop that serves the pages
+        streamed = await asyncio.to_thread(lambda: list(iter_documents(urls, cache_dir=cache_dir, max_concurrency=3,
+                                                                        per_host=2, host_delay=0.02)))
+        assert sorted(d.metadata["source"] for d in streamed) == sorted(urls), streamed
+        assert max(peak.values()) <= 2, peak
+    finally:
+        await runner.cleanup()
+    print(f"ok: {served}, peak per host {peak}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_self_check())
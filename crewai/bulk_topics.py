@@ -0,0 +1,101 @@
+"""
+Bulk article generation. Reads one topic per line and runs a crew per topic in a worker pool.
+All crews share per-provider rate limiters for the LLM and Serper. Each article is written to
+--out-dir as soon as it is finished, and topics that already have an article are skipped, so an
+interrupted batch resumes where it stopped.
+
+    python bulk_topics.py topics.txt --out-dir articles --workers 6
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from content_jobs import build_crew
+from rate_limits import RateLimitedLLM, RateLimiter
+from search_cache import make_search_tool
+
+load_dotenv()
+
+#Defaults are a conservative OpenAI tier for gpt-4 and Serper's standard plan; override per account
+LLM_RPM = int(os.getenv("LLM_RPM", "500"))
+LLM_TPM = int(os.getenv("LLM_TPM", "30000"))
+SERPER_RPM = int(os.getenv("SERPER_RPM", "300"))
+
+
+def slugify(topic):
+    return re.sub(r"[^a-z0-9]+", "_", topic.lower()).strip("_")[:80] or "topic"
+
+
+def article_path(out_dir, topic):
+    #Different topics can share a slug ("C++" and "C#" both become "c"); the hash keeps their files apart
+    digest = hashlib.sha256(topic.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(out_dir, f"{slugify(topic)}_{digest}.md")
+
+
+def write_checkpoint(path, markdown):
+    #Write then rename, so a crash never leaves a half-written article that would be skipped on resume
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(markdown)
+    os.replace(tmp_path, path)
+
+
+def generate(topic, out_dir, llm, search_tool):
+    started = time.perf_counter()
+    crew = build_crew(llm, search_tool, on_step=lambda agent, step: None)
+    markdown = crew.kickoff({"topic": topic}).raw
+    write_checkpoint(article_path(out_dir, topic), markdown)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("topics_file", help="one topic per line")
+    parser.add_argument("--out-dir", default="articles")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--model", default="gpt-4")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    args = parser.parse_args()
+
+    with open(args.topics_file, encoding="utf-8") as f:
+        topics = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+    os.makedirs(args.out_dir, exist_ok=True)
+    pending = [topic for topic in topics if not os.path.exists(article_path(args.out_dir, topic))]
+    print(f"{len(topics)} topics, {len(topics) - len(pending)} already done, {len(pending)} to generate")
+
+    llm_limiter = RateLimiter(args.model, LLM_RPM, LLM_TPM)
+    serper_limiter = RateLimiter("serper", SERPER_RPM)
+    llm = RateLimitedLLM(model=args.model, temperature=args.temperature, limiter=llm_limiter)
+    search_tool = make_search_tool(n=10, limiter=serper_limiter)
+
+    started = time.perf_counter()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as workers, \
+            open(os.path.join(args.out_dir, "progress.jsonl"), "a", encoding="utf-8") as progress:
+        futures = {workers.submit(generate, topic, args.out_dir, llm, search_tool): topic for topic in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            topic = futures[future]
+            try:
+                seconds = future.result()
+                record = {"topic": topic, "status": "done", "seconds": round(seconds, 1)}
+            except Exception as err:
+                failed += 1
+                record = {"topic": topic, "status": "failed", "error": str(err)}
+            progress.write(json.dumps(record) + "\n")
+            progress.flush()
+            print(f"[{done}/{len(pending)}] {record['status']}: {topic}")
+
+    print(f"Finished in {time.perf_counter() - started:.1f}s, {failed} failed (re-run to retry them)")
+    for limiter in (llm_limiter, serper_limiter):
+        print(f"{limiter.name}: {limiter.stats['calls']} calls, {limiter.stats['rate_limited']} rate-limited, "
+              f"{limiter.stats['waited_seconds']:.1f}s spent waiting for budget")
+
+
+if __name__ == "__main__":
+    main()
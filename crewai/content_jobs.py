@@ -0,0 +1,216 @@
+"""
+Background generation for the Streamlit content writer. Jobs run in a shared worker pool and
+record each agent step as it happens, so the page can poll a job by ID across reruns. Finished
+articles are stored in a SQLite cache keyed by (topic, temperature, model); a repeated request
+is answered from it without building a crew.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from crewai import Agent, Task, Crew, LLM
+
+from search_cache import make_search_tool
+
+CACHE_PATH = os.getenv("CONTENT_CACHE_PATH", "content_cache.sqlite")
+WORKERS = int(os.getenv("CONTENT_WORKERS", "4"))
+#Finished jobs are forgotten after this long; their articles stay in the result cache
+JOB_RETENTION_SECONDS = 3600
+
+
+def cache_key(topic, temperature, model):
+    return hashlib.sha256(json.dumps([" ".join(topic.lower().split()), round(temperature, 2), model]).encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path=CACHE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS articles (key TEXT PRIMARY KEY, topic TEXT, markdown TEXT, created_at REAL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT markdown FROM articles WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, topic, markdown):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO articles (key, topic, markdown, created_at) VALUES (?, ?, ?, ?)",
+                               (key, topic, markdown, time.time()))
+            self._conn.commit()
+
+
+class Job:
+    def __init__(self, topic, temperature, model, key):
+        self.id = uuid.uuid4().hex[:12]
+        self.topic = topic
+        self.temperature = temperature
+        self.model = model
+        self.key = key
+        self.status = "queued"
+        self.steps = []
+        self.result = None
+        self.error = None
+        self.cached = False
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def record_step(self, agent, step):
+        #AgentAction carries thought/tool/result, AgentFinish carries thought/output
+        parts = [getattr(step, "thought", "") or ""]
+        if getattr(step, "tool", None):
+            parts.append(f"Using tool: {step.tool} ({step.tool_input})")
+        text = "\n".join(part for part in parts if part).strip() or str(getattr(step, "output", step))[:500]
+        self.steps.append((agent, text))
+
+
+def build_crew(llm, search_tool, on_step):
+    senior_research_analyst = Agent(
+        role = "Senior Research Analyst",
+        goal = "Research, analyze, and synthesize comprehensive information on {topic} from reliable sources",
+        backstory = "You are an expert research analyst with advanced web research skills. You excel at finding, analyzing, and synthesizing "
+                    "information from across the internet using search tools. You are skilled at dishtinguishing reliable sources from "
+                    "unreliable ones, fact checking, cross-referencing information, and indentifing well-organized research briefs with proper "
+                    "citations and source verification. Your analysis includes both raw data and interpreted insights, making complex information "
+                    "accesible and actionable.",
+        allow_delegation = False,
+        verbose = True,
+        tools = [search_tool],
+        llm = llm,
+        step_callback = lambda step: on_step("Senior Research Analyst", step),
+    )
+
+    content_writer = Agent(
+        role = "Content Writer",
+        goal = "Transform research findings into engaging blog posts while maintaining accuracy",
+        backstory = "You are a skilled content writer specialized in creating engaging, accesible content from technical research. You work closely "
+                    "with the Senior Research Analyst and excel at maintaining the perfect balance between informative and enertaining writing, "
+                    "while ensuring all facts and citations from the research are properly incorparated. You have a talent for making complex topics"
+                    "approachable without oversimplyfying them.",
+        allow_delegation = False,
+        verbose = True,
+        tools = [search_tool],
+        llm = llm,
+        step_callback = lambda step: on_step("Content Writer", step),
+    )
+
+    research_tasks = Task(
+        description=("""
+            1. Conduct comprehensive research on {topic} including:
+                - Recent developments and news
+                - Key industry trends and inovations
+                - Expert opinions and analysis
+                - Statistical data and market insights
+            2. Evaluate source credibility and fact-check all information
+            3. Organize findings into a structured research brief
+            4. Include all relevant citations and sources
+        """),
+        expected_output=("""
+            A detailed research report containing the following:
+                - Excecutive summary of key findings
+                - Comprehensive analysis of current trends and developments
+                - List of verified facts and statistics
+                - All citations and links to original sources
+                - Clear categorization of main themes and patterns
+            Please format with clear sections and bullet points for easy reference.
+        """),
+        agent=senior_research_analyst
+    )
+
+    writing_task = Task(
+        description=("""
+            Using the research brief provided, create an engaging blog post that:
+                1. Transforms technicalinformation into accesible content
+                2. Maintains all factual accuracy and citations from the research
+                3. Includes:
+                    - Attention-Grabbing introduction
+                    - Well-structured body sections with clear headings
+                    - Compelling conclusion
+                4. Preserves all source citations in [Source: URL] format
+                5. Includes a References section at the end
+        """),
+        expected_output=("""
+            A polished blog post in markdown format that:
+                - Engages readers while maintaining accuracy
+                - Contains properly structured sections
+                - Includes Inline Citations with hyperlink to original source url
+                - Presents information in an accesible yet informative way
+                - Follows proper markdown formatting, use h1 for the title and h3 for the sub-sections
+        """),
+        agent=content_writer
+    )
+
+    return Crew(
+        agents=[senior_research_analyst, content_writer],
+        tasks=[research_tasks, writing_task],
+        verbose=True
+    )
+
+
+class JobQueue:
+    """Worker pool shared by every Streamlit session; identical requests in flight share one job."""
+
+    def __init__(self, workers=WORKERS, cache=None):
+        self.cache = cache or ResultCache()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="content-job")
+        self._jobs = {}
+        self._running = {}
+        self._lock = threading.Lock()
+        self._llms = {}
+        self._search_tool = make_search_tool(n=1)
+
+    def llm(self, model, temperature):
+        with self._lock:
+            if (model, temperature) not in self._llms:
+                self._llms[model, temperature] = LLM(model=model, temperature=temperature)
+            return self._llms[model, temperature]
+
+    def submit(self, topic, temperature, model):
+        key = cache_key(topic, temperature, model)
+        with self._lock:
+            self._forget_old()
+            if key in self._running:
+                return self._running[key].id
+            job = Job(topic, temperature, model, key)
+            self._jobs[job.id] = job
+            cached = self.cache.get(key)
+            if cached is not None:
+                job.status, job.result, job.cached, job.finished_at = "done", cached, True, time.time()
+                return job.id
+            self._running[key] = job
+        self._pool.submit(self._run, job)
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        job.status = "running"
+        try:
+            crew = build_crew(self.llm(job.model, job.temperature), self._search_tool, job.record_step)
+            job.result = crew.kickoff({"topic": job.topic}).raw
+            self.cache.put(job.key, job.topic, job.result)
+            job.status = "done"
+        except Exception as err:
+            job.error = str(err)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running.pop(job.key, None)
+
+    def _forget_old(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -1,5 +1,5 @@
 from crewai import Agent, Task, Crew, LLM
-from crewai_tools import SerperDevTool
+from search_cache import make_search_tool
 
 from dotenv import load_dotenv
 
@@ -11,12 +11,14 @@ topic = "Medical Industry Using AI"
 llm = LLM(model="gpt-4")
 
 #Tool 2
-search_tool = SerperDevTool(n=10)
+#Shared by both agents: normalized, deduplicated and cached on disk across runs
+search_tool = make_search_tool(n=10)
 
 #Agent 1: Senior Research Analyst
 senior_research_analyst = Agent(
     role = "Senior Research Analyst",
-    goal = f"Research, analyze, and synthesize comprehensive information on {topic} from reliable sources",
+    #Filled in by kickoff inputs, so copies of this agent (research_fanout.py) research the requested topic
+    goal = "Research, analyze, and synthesize comprehensive information on {topic} from reliable sources",
     backstory = "You are an expert research analyst with advanced web research skills. You excel at finding, analyzing, and synthesizing "
                 "information from across the internet using search tools. You are skilled at dishtinguishing reliable sources from "
                 "unreliable ones, fact checking, cross-referencing information, and indentifing well-organized research briefs with proper "
@@ -99,6 +101,7 @@ crew = Crew(
     verbose=True
 )
 
-result = crew.kickoff({"topic": topic})
+if __name__ == "__main__":
+    result = crew.kickoff({"topic": topic})
 
-print(result)
\ No newline at end of file
+    print(result)
\ No newline at end of file
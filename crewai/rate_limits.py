@@ -0,0 +1,99 @@
+"""
+Per-provider request and token budgets shared by every crew in the process, with backoff on 429s.
+A rate-limited provider pauses only the calls to that provider; work on other providers goes on.
+"""
+import random
+import threading
+import time
+
+from crewai import LLM
+
+MAX_BACKOFF_SECONDS = 60
+
+
+def is_rate_limited(err):
+    status = getattr(err, "status_code", None) or getattr(getattr(err, "response", None), "status_code", None)
+    return status == 429 or type(err).__name__ == "RateLimitError" or "429" in str(err)
+
+
+def retry_after(err):
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Token buckets for requests/min and (optionally) tokens/min, plus a pause set by 429 responses."""
+
+    def __init__(self, name, requests_per_minute, tokens_per_minute=None, max_retries=6):
+        self.name = name
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.max_retries = max_retries
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "rate_limited": 0, "waited_seconds": 0.0}
+
+    def acquire(self, tokens=0):
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed, self._updated = now - self._updated, now
+                self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+                if self.tpm:
+                    self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    wait = max((1 - self._requests) * 60 / self.rpm,
+                               (tokens - self._tokens) * 60 / self.tpm if self.tpm else 0)
+                    if wait <= 0:
+                        self._requests -= 1
+                        self._tokens -= tokens
+                        self.stats["calls"] += 1
+                        self.stats["waited_seconds"] += now - started
+                        return
+            time.sleep(min(wait, 5))
+
+    def backoff(self, attempt, delay=None):
+        delay = delay or min(MAX_BACKOFF_SECONDS, 2 ** attempt + random.random())
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.stats["rate_limited"] += 1
+        return delay
+
+    def call(self, fn, tokens=0):
+        for attempt in range(self.max_retries):
+            self.acquire(tokens)
+            try:
+                return fn()
+            except Exception as err:
+                if not is_rate_limited(err) or attempt == self.max_retries - 1:
+                    raise
+                delay = self.backoff(attempt, retry_after(err))
+                print(f"---RATE LIMIT: {self.name} returned 429, pausing {delay:.1f}s (attempt {attempt + 1})---")
+
+
+def estimate_tokens(messages, completion_tokens=1000):
+    """Rough prompt size (4 characters per token) plus room for the reply."""
+    if isinstance(messages, str):
+        return len(messages) // 4 + completion_tokens
+    return sum(len(str(message.get("content", ""))) for message in messages) // 4 + completion_tokens
+
+
+class RateLimitedLLM(LLM):
+    """crewai LLM whose completions go through a RateLimiter."""
+
+    def __init__(self, *args, limiter, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def call(self, messages, *args, **kwargs):
+        return self.limiter.call(lambda: super(RateLimitedLLM, self).call(messages, *args, **kwargs),
+                                 tokens=estimate_tokens(messages))
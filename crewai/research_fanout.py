@@ -0,0 +1,114 @@
+"""
+Fan-out mode for the research crew. The topic is split into subtopics, each researched by its
+own analyst crew running concurrently; the briefs are merged into one with duplicate sources
+removed, and the writer turns that into the blog post.
+
+    python research_fanout.py --topic "Medical Industry Using AI"
+    python research_fanout.py --compare    # also time the sequential crew and report the speedup
+
+With --compare, each run gets its own empty in-memory search cache. Neither run is then answered
+from searches the other one (or an earlier run) already made.
+"""
+import argparse
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from crewai import Crew, Task
+
+from crewai_with_agentic_rag import content_writer, crew, search_tool, senior_research_analyst, topic as default_topic, writing_task
+from search_cache import SearchCache
+
+SUBTOPICS = {
+    "Trends": "recent developments, news, key industry trends and innovations",
+    "Expert Opinion": "expert opinions and analysis from credible practitioners and researchers",
+    "Statistics": "statistical data, market size, adoption figures and other market insights",
+}
+URL_RE = re.compile(r"https?://[^\s()<>\[\]\"']+")
+
+
+def subtopic_crew(focus):
+    analyst = senior_research_analyst.copy()
+    task = Task(
+        description=(f"""
+            Research {{topic}}, focusing only on {focus}.
+            Evaluate source credibility, fact-check every claim and keep the full URL of each source.
+        """),
+        expected_output=("""
+            A concise research brief in bullet points. Every bullet ends with [Source: URL].
+        """),
+        agent=analyst,
+    )
+    return Crew(agents=[analyst], tasks=[task], verbose=False)
+
+
+def normalize_url(url):
+    url = url.rstrip(".,;:").split("#")[0].rstrip("/")
+    scheme, _, rest = url.partition("://")
+    host, slash, path = rest.partition("/")
+    return f"{scheme.lower()}://{host.lower().removeprefix('www.')}{slash}{path}"
+
+
+def merge_briefs(briefs):
+    """One brief with a section per subtopic and a single numbered source list without duplicates."""
+    sources, seen, cited = [], set(), 0
+    sections = []
+    for subtopic, text in briefs.items():
+        sections.append(f"## {subtopic}\n{text.strip()}")
+        for url in URL_RE.findall(text):
+            cited += 1
+            key = normalize_url(url)
+            if key not in seen:
+                seen.add(key)
+                sources.append(url.rstrip(".,;:"))
+    sections.append("## Sources\n" + "\n".join(f"{i}. {url}" for i, url in enumerate(sources, 1)))
+    print(f"---MERGE: {cited} citations, {len(sources)} unique sources---")
+    return "\n\n".join(sections)
+
+
+def research(topic, workers=len(SUBTOPICS)):
+    crews = {subtopic: subtopic_crew(focus) for subtopic, focus in SUBTOPICS.items()}
+    with ThreadPoolExecutor(max_workers=workers) as threads:
+        futures = {subtopic: threads.submit(c.kickoff, {"topic": topic}) for subtopic, c in crews.items()}
+        return merge_briefs({subtopic: future.result().raw for subtopic, future in futures.items()})
+
+
+def write(topic, brief):
+    #Braces in the brief would be taken for input placeholders
+    brief = brief.replace("{", "(").replace("}", ")")
+    task = Task(
+        description=writing_task.description + f"\n\nResearch brief:\n{brief}",
+        expected_output=writing_task.expected_output,
+        agent=content_writer,
+    )
+    return Crew(agents=[content_writer], tasks=[task], verbose=True).kickoff({"topic": topic})
+
+
+def run_fanout(topic):
+    started = time.perf_counter()
+    brief = research(topic)
+    researched = time.perf_counter()
+    result = write(topic, brief)
+    finished = time.perf_counter()
+    print(f"---FAN-OUT: research {researched - started:.1f}s, writing {finished - researched:.1f}s, total {finished - started:.1f}s---")
+    return result, finished - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topic", default=default_topic)
+    parser.add_argument("--compare", action="store_true", help="also run the sequential crew and report the speedup")
+    args = parser.parse_args()
+
+    if args.compare:
+        #Every analyst copy shares this tool, so swapping its cache isolates the whole run
+        search_tool.search_cache = SearchCache(":memory:")
+    result, fanout_seconds = run_fanout(args.topic)
+    print(result)
+    if args.compare:
+        search_tool.search_cache = SearchCache(":memory:")
+        started = time.perf_counter()
+        crew.kickoff({"topic": args.topic})
+        sequential_seconds = time.perf_counter() - started
+        print(f"Sequential crew {sequential_seconds:.1f}s, fan-out {fanout_seconds:.1f}s, "
+              f"speedup {sequential_seconds / fanout_seconds:.2f}x")
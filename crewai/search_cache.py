@@ -0,0 +1,149 @@
+"""
+Caching wrapper for the crew's web search tool. Queries are normalized, identical searches that
+are already running in another agent or thread wait for that call instead of issuing their own,
+and results are kept on disk for SEARCH_CACHE_TTL seconds so repeated crews on a topic hit
+Serper once.
+
+Set SERPER_STUB=1 to answer searches from a local stub instead of the Serper endpoint.
+
+    SERPER_STUB=1 python search_cache.py    # self-check against the stub
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any
+
+from crewai.tools import BaseTool
+
+CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "search_cache.sqlite")
+TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))
+
+
+def normalize_query(query):
+    """Case, whitespace, surrounding quotes and trailing punctuation do not change a search."""
+    query = " ".join(str(query).lower().split())
+    return re.sub(r"^[\"'\s]+|[\"'\s?.!]+$", "", query)
+
+
+class SearchCache:
+    def __init__(self, path=CACHE_PATH, ttl_seconds=TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS searches (key TEXT PRIMARY KEY, result TEXT, stored_at REAL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {"hits": 0, "misses": 0, "deduplicated": 0}
+
+    def get_or_fetch(self, key, fetch):
+        with self._lock:
+            row = self._conn.execute("SELECT result, stored_at FROM searches WHERE key = ?", (key,)).fetchone()
+            if row and time.time() - row[1] <= self.ttl_seconds:
+                self.stats["hits"] += 1
+                return json.loads(row[0])
+            pending = self._in_flight.get(key)
+            if pending is None:
+                pending = self._in_flight[key] = Future()
+                owner = True
+                self.stats["misses"] += 1
+            else:
+                owner = False
+                self.stats["deduplicated"] += 1
+        if not owner:
+            return pending.result()
+        try:
+            result = fetch()
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO searches (key, result, stored_at) VALUES (?, ?, ?)",
+                                   (key, json.dumps(result), time.time()))
+                self._conn.commit()
+            pending.set_result(result)
+            return result
+        except Exception as err:
+            #Waiters see the same failure; nothing is cached so the next call retries
+            pending.set_exception(err)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+
+class StubSearch:
+    """Stands in for the Serper endpoint: deterministic organic results and a call counter."""
+
+    name = "Search the internet"
+    description = "Search the internet for a query (local stub)."
+    args_schema = None
+
+    def __init__(self, n=10, delay=0.2):
+        self.n = n
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def run(self, search_query):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        slug = re.sub(r"\W+", "-", search_query.lower()).strip("-")
+        return {"searchParameters": {"q": search_query}, "organic": [
+            {"title": f"{search_query} #{i + 1}", "link": f"https://example.com/{slug}/{i + 1}",
+             "snippet": f"Stub result {i + 1} for {search_query}.", "position": i + 1}
+            for i in range(self.n)]}
+
+
+class CachedSearchTool(BaseTool):
+    name: str = "Search the internet"
+    description: str = "Search the internet for a query."
+    inner: Any = None
+    search_cache: Any = None
+    limiter: Any = None
+
+    def _run(self, search_query: str, **kwargs) -> Any:
+        n = getattr(self.inner, "n", None)
+        key = hashlib.sha256(json.dumps([self.name, n, normalize_query(search_query), kwargs], sort_keys=True).encode()).hexdigest()
+        fetch = lambda: self.inner.run(search_query=search_query, **kwargs)
+        #Only cache misses spend the provider's rate limit
+        if self.limiter is not None:
+            return self.search_cache.get_or_fetch(key, lambda: self.limiter.call(fetch))
+        return self.search_cache.get_or_fetch(key, fetch)
+
+
+def make_search_tool(n=10, cache=None, limiter=None):
+    """SerperDevTool(n=n), or the local stub when SERPER_STUB is set, behind a shared disk cache."""
+    if os.getenv("SERPER_STUB"):
+        inner = StubSearch(n=n)
+    else:
+        from crewai_tools import SerperDevTool
+        inner = SerperDevTool(n=n)
+    fields = {"name": inner.name, "description": inner.description, "inner": inner, "search_cache": cache or SearchCache(),
+              "limiter": limiter}
+    if inner.args_schema is not None:
+        fields["args_schema"] = inner.args_schema
+    return CachedSearchTool(**fields)
+
+
+if __name__ == "__main__":
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    os.environ.setdefault("SERPER_STUB", "1")
+    path = os.path.join(tempfile.mkdtemp(), "search_cache.sqlite")
+    tool = make_search_tool(n=3, cache=SearchCache(path))
+    queries = ["AI in medicine", "  ai IN medicine?", '"AI in Medicine"'] * 4
+    with ThreadPoolExecutor(max_workers=len(queries)) as threads:
+        list(threads.map(lambda q: tool._run(search_query=q), queries))
+    print(f"{len(queries)} concurrent searches -> {tool.inner.calls} endpoint call(s), {tool.search_cache.stats}")
+
+    again = make_search_tool(n=3, cache=SearchCache(path))
+    again._run(search_query="AI in medicine")
+    print(f"new process, same query -> {again.inner.calls} endpoint call(s), {again.search_cache.stats}")
+
+    expired = make_search_tool(n=3, cache=SearchCache(path, ttl_seconds=0))
+    expired._run(search_query="AI in medicine")
+    print(f"ttl expired -> {expired.inner.calls} endpoint call(s), {expired.search_cache.stats}")
@@ -0,0 +1,218 @@
+"""
+In-memory stand-in for the Gmail API resource, covering the calls MailMirror makes:
+users().getProfile, users().messages().list/get and users().history().list. Mailbox changes are
+recorded as history the way Gmail does, and expire_history() makes old history ids answer 404.
+messages().list(q=...) understands free text, from:, subject:, after:/before: (epoch seconds or
+YYYY/MM/DD), label:/in:, is:, negation with - and OR, enough to check the mirror's fallback to
+the API search.
+
+    python fake_gmail.py    # self-check of MailMirror against the fake
+"""
+import base64
+import itertools
+import re
+from datetime import datetime, timezone
+
+
+class FakeHttpError(Exception):
+    """Shaped like googleapiclient.errors.HttpError: the status is on err.resp.status."""
+
+    def __init__(self, status, reason):
+        super().__init__(f"<HttpError {status}: {reason}>")
+        self.resp = type("Resp", (), {"status": status})()
+
+
+class _Request:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return self._fn()
+
+
+class FakeGmail:
+    def __init__(self):
+        self.mailbox = {}
+        self.search_text = {}
+        #User label id -> display name, as labels().list() would report it
+        self.label_names = {}
+        self.records = []
+        self.history_id = 1000
+        self.oldest_history_id = self.history_id
+        self.calls = {"list": 0, "get": 0, "history": 0}
+        self._ids = itertools.count(1)
+
+    def _record(self, **change):
+        self.history_id += 1
+        self.records.append({"id": str(self.history_id), **change})
+
+    def add_message(self, sender, subject, body, to="me@example.com", labels=("INBOX", "UNREAD"), received_at=None):
+        message_id = f"m{next(self._ids):05d}"
+        received_at = 1700000000 + len(self.mailbox) if received_at is None else received_at
+        self.search_text[message_id] = f"{sender} {subject} {body}".lower()
+        self.mailbox[message_id] = {
+            "id": message_id, "threadId": f"t{message_id}", "labelIds": list(labels),
+            "snippet": body[:100], "internalDate": str(received_at * 1000),
+            "payload": {"mimeType": "multipart/alternative", "headers": [
+                {"name": "From", "value": sender}, {"name": "To", "value": to},
+                {"name": "Subject", "value": subject}, {"name": "Date", "value": "Tue, 14 Nov 2023 22:13:20 +0000"}],
+                "parts": [{"mimeType": "text/plain", "body": {"data": base64.urlsafe_b64encode(body.encode()).decode()}}]},
+        }
+        self._record(messagesAdded=[{"message": {"id": message_id, "threadId": f"t{message_id}"}}])
+        return message_id
+
+    def delete_message(self, message_id):
+        del self.mailbox[message_id]
+        del self.search_text[message_id]
+        self._record(messagesDeleted=[{"message": {"id": message_id}}])
+
+    def set_labels(self, message_id, labels):
+        self.mailbox[message_id]["labelIds"] = list(labels)
+        self._record(labelsAdded=[{"message": {"id": message_id}, "labelIds": list(labels)}])
+
+    def expire_history(self):
+        #Every history id handed out so far now answers 404, as after Gmail's retention window
+        self.oldest_history_id = self.history_id + 1
+        self.records.clear()
+
+    #The googleapiclient call chain: service.users().messages().get(...).execute()
+
+    def users(self):
+        return self
+
+    def getProfile(self, userId):
+        return _Request(lambda: {"emailAddress": "me@example.com", "historyId": str(self.history_id)})
+
+    def messages(self):
+        return _Messages(self)
+
+    def history(self):
+        return _History(self)
+
+
+class _Messages:
+    def __init__(self, fake):
+        self.fake = fake
+
+    def _matches(self, message_id, q):
+        #Alternatives split on OR, each an AND of terms; a leading - negates a term
+        return any(all(self._term(message_id, key, value.strip('"').lower()) != bool(negated)
+                       for negated, key, value in re.findall(r'(-?)(?:(\w+):)?("[^"]*"|[^\s"]+)', alternative))
+                   for alternative in re.split(r"\s+OR\s+", q))
+
+    def _term(self, message_id, key, value):
+        message = self.fake.mailbox[message_id]
+        headers = {h["name"].lower(): h["value"].lower() for h in message["payload"]["headers"]}
+        received_at = int(message["internalDate"]) // 1000
+        labels = {label.lower() for label in message["labelIds"]}
+        labels |= {self.fake.label_names[label].lower() for label in message["labelIds"] if label in self.fake.label_names}
+        if key in ("after", "before"):
+            when = int(value) if value.isdigit() else int(
+                datetime.strptime(value, "%Y/%m/%d").replace(tzinfo=timezone.utc).timestamp())
+            return received_at >= when if key == "after" else received_at < when
+        if key in ("from", "subject"):
+            return value in headers.get(key, "")
+        if key in ("label", "in"):
+            return value in labels
+        if key == "is":
+            return ("unread" not in labels) if value == "read" else value in labels
+        return value in self.fake.search_text[message_id]
+
+    def list(self, userId, maxResults=100, pageToken=None, q=None):
+        def run():
+            self.fake.calls["list"] += 1
+            ids = sorted(self.fake.mailbox, key=lambda i: int(self.fake.mailbox[i]["internalDate"]), reverse=True)
+            if q:
+                ids = [i for i in ids if self._matches(i, q)]
+            start = int(pageToken or 0)
+            response = {"messages": [{"id": i, "threadId": self.fake.mailbox[i]["threadId"]}
+                                     for i in ids[start:start + maxResults]]}
+            if start + maxResults < len(ids):
+                response["nextPageToken"] = str(start + maxResults)
+            return response
+        return _Request(run)
+
+    def get(self, userId, id, format="full"):
+        def run():
+            self.fake.calls["get"] += 1
+            if id not in self.fake.mailbox:
+                raise FakeHttpError(404, "Not Found")
+            return self.fake.mailbox[id]
+        return _Request(run)
+
+
+class _History:
+    def __init__(self, fake):
+        self.fake = fake
+
+    def list(self, userId, startHistoryId, pageToken=None):
+        def run():
+            self.fake.calls["history"] += 1
+            if int(startHistoryId) < self.fake.oldest_history_id:
+                raise FakeHttpError(404, "Requested entity was not found.")
+            return {"history": [h for h in self.fake.records if int(h["id"]) > int(startHistoryId)],
+                    "historyId": str(self.fake.history_id)}
+        return _Request(run)
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    from mail_mirror import MailMirror
+
+    fake = FakeGmail()
+    invoice = fake.add_message("Billing <billing@acme.com>", "Invoice #42", "Your invoice for March is attached.")
+    fake.add_message("Ana <ana@example.com>", "Lunch tomorrow?", "Are you free for lunch tomorrow at noon?")
+    fake.add_message("News <news@example.com>", "Weekly digest", "Top stories this week.", labels=("CATEGORY_UPDATES",))
+
+    mirror = MailMirror(fake, path=os.path.join(tempfile.mkdtemp(), "mirror.sqlite"), max_messages=10, stale_seconds=0)
+    mirror.sync()
+    assert fake.calls["get"] == 3, fake.calls
+    assert [m["subject"] for m in mirror.search("invoice")] == ["Invoice #42"]
+
+    fake.add_message("Ana <ana@example.com>", "Re: Lunch tomorrow?", "Noon works, see you there.")
+    fake.set_labels(invoice, ["INBOX"])
+    gets = fake.calls["get"]
+    assert len(mirror.search("from:ana lunch")) == 2
+    assert fake.calls["get"] - gets == 2, "incremental sync fetches only the changed messages"
+    assert [m["subject"] for m in mirror.search("is:unread")] == ["Re: Lunch tomorrow?", "Lunch tomorrow?"]
+
+    fake.delete_message(invoice)
+    assert mirror.search("invoice") == []
+
+    fake.expire_history()
+    fake.add_message("Billing <billing@acme.com>", "Invoice #43", "April invoice.")
+    assert [m["subject"] for m in mirror.search("invoice")] == ["Invoice #43"]
+    assert mirror.stats["full_syncs"] == 2
+    #The mirror holds the whole mailbox, so a miss is final
+    assert mirror.search("quarterly report") == [] and mirror.stats["api_searches"] == 0
+
+    #Syntax the mirror cannot express goes to the API even though the mirror is complete
+    fake.label_names["Label_1"] = "Work"
+    fake.add_message("Boss <boss@corp.example>", "Q3 plan", "Draft plan attached.", labels=("INBOX", "Label_1"))
+    subjects = lambda query: sorted(m["subject"] for m in mirror.search(query))
+    assert "Lunch tomorrow?" not in subjects("-lunch") and "Q3 plan" in subjects("-lunch")
+    assert "Q3 plan" not in subjects("-from:boss") and subjects("-from:boss")
+    assert subjects("lunch OR plan") == ["Lunch tomorrow?", "Q3 plan", "Re: Lunch tomorrow?"]
+    assert subjects("label:Work") == ["Q3 plan"]
+    assert subjects("is:read") == ["Q3 plan", "Weekly digest"]
+    assert mirror.stats["api_searches"] == 7
+    assert subjects("in:inbox is:unread") == ["Invoice #43", "Lunch tomorrow?", "Re: Lunch tomorrow?"]
+    assert mirror.stats["api_searches"] == 7, "system labels stay local"
+
+    #A mirror of only the two newest messages: older mail and date operators go to the API
+    big = FakeGmail()
+    old = big.add_message("Tax Office <tax@gov.example>", "Tax return 2019", "Your 2019 return was received.",
+                          received_at=1560000000)
+    big.add_message("Ana <ana@example.com>", "Photos", "Photos from the trip.", received_at=1700000000)
+    big.add_message("Bo <bo@example.com>", "Hello", "Hi there.", received_at=1700000100)
+    window = MailMirror(big, path=os.path.join(tempfile.mkdtemp(), "mirror.sqlite"), max_messages=2, stale_seconds=0)
+    window.sync()
+    assert [m["id"] for m in window.search("tax return")] == [old] and window.stats["api_searches"] == 1
+    gets = big.calls["get"]
+    assert window.get(old)["subject"] == "Tax return 2019" and big.calls["get"] == gets, "found by the API, then read locally"
+    assert [m["subject"] for m in window.search("after:1600000000 from:ana")] == ["Photos"]
+    assert [m["subject"] for m in window.search("before:2020/01/01")] == ["Tax return 2019"]
+    assert window.stats["api_searches"] == 3
+    print(f"ok: {mirror.stats}, {window.stats}, fake calls {fake.calls}")
@@ -6,6 +6,7 @@ from langchain_community.agent_toolkits import GmailToolkit
 from langchain_openai import ChatOpenAI
 from langchain import hub
 from langchain.agents import AgentExecutor, create_openai_functions_agent
+from mail_mirror import API_TOOLS, MailMirror, mirror_tools
 
 import os
 from dotenv import load_dotenv
@@ -23,7 +24,10 @@ credentials = get_gmail_credentials(
 api_resource = build_resource_service(credentials=credentials)
 toolkit = GmailToolkit(api_resource=api_resource)
 
-tools = toolkit.get_tools()
+#Search, read and summarize answer from the local mirror; sends and drafts still go to the API
+mirror = MailMirror(api_resource)
+mirror.sync()
+tools = mirror_tools(mirror) + [t for t in toolkit.get_tools() if t.name in API_TOOLS]
 
 OPENAI_API_KEY=os.getenv("OPENAI_API_KEY")
 
@@ -33,11 +37,11 @@ instructions = """You are an assistant."""
 base_prompt = hub.pull("langchain-ai/openai-functions-template")
 prompt = base_prompt.partial(instructions=instructions)
 
-agent = create_openai_functions_agent(llm, toolkit.get_tools(), prompt)
+agent = create_openai_functions_agent(llm, tools, prompt)
 
 agent_executor = AgentExecutor(
     agent=agent,
-    tools=toolkit.get_tools(),
+    tools=tools,
     # This is set to False to prevent information about my email showing up on the screen
     # Normally, it is helpful to have it set to True however.
     verbose=False,
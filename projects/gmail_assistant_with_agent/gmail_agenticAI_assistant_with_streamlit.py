@@ -6,6 +6,7 @@ from langchain_community.agent_toolkits import GmailToolkit
 from langchain_openai import ChatOpenAI
 from langchain import hub
 from langchain.agents import AgentExecutor, create_openai_functions_agent
+from mail_mirror import API_TOOLS, MailMirror, mirror_tools
 from streamlit import streamlit as st
 
 import os
@@ -13,34 +14,40 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-toolkit = GmailToolkit()
-
-credentials = get_gmail_credentials(
-    token_file="token.json",
-    scopes=["https://mail.google.com/"],
-    client_secrets_file="credentials.json",
-)
+@st.cache_resource(show_spinner=False)
+def get_assistant():
+    """Credentials, mirror and agent are built once per server process, not on every rerun."""
+    credentials = get_gmail_credentials(
+        token_file="token.json",
+        scopes=["https://mail.google.com/"],
+        client_secrets_file="credentials.json",
+    )
 
-api_resource = build_resource_service(credentials=credentials)
-toolkit = GmailToolkit(api_resource=api_resource)
+    api_resource = build_resource_service(credentials=credentials)
+    toolkit = GmailToolkit(api_resource=api_resource)
 
-tools = toolkit.get_tools()
+    #Search, read and summarize answer from the local mirror; sends and drafts still go to the API
+    mirror = MailMirror(api_resource)
+    #Synced once here; after that a search catches up when the mirror is stale, or the refresh button does
+    mirror.sync()
+    tools = mirror_tools(mirror) + [t for t in toolkit.get_tools() if t.name in API_TOOLS]
 
-OPENAI_API_KEY=os.getenv("OPENAI_API_KEY")
+    OPENAI_API_KEY=os.getenv("OPENAI_API_KEY")
 
-llm = ChatOpenAI(api_key=OPENAI_API_KEY)
+    llm = ChatOpenAI(api_key=OPENAI_API_KEY)
 
-instructions = """You are an assistant."""
-base_prompt = hub.pull("langchain-ai/openai-functions-template")
-prompt = base_prompt.partial(instructions=instructions)
+    instructions = """You are an assistant."""
+    base_prompt = hub.pull("langchain-ai/openai-functions-template")
+    prompt = base_prompt.partial(instructions=instructions)
 
-agent = create_openai_functions_agent(llm, toolkit.get_tools(), prompt)
+    agent = create_openai_functions_agent(llm, tools, prompt)
 
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=toolkit.get_tools(),
-    verbose=False,
-)
+    agent_executor = AgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=False,
+    )
+    return mirror, agent_executor
 
 #Page config
 st.set_page_config(page_title="Gmail Assistant", page_icon="✉️", layout="wide")
@@ -50,6 +57,9 @@ st.set_page_config(page_title="Gmail Assistant", page_icon="✉️", layout="wid
 st.title("Your personal Gmail assistant")
 st.markdown("Ask an agent to help with your gmail")
 
+with st.spinner("Syncing your mailbox..."):
+    mirror, agent_executor = get_assistant()
+
 # Sidebar 
 
 with st.sidebar:
@@ -63,6 +73,10 @@ with st.sidebar:
     
     generate_button = st.button("Generate Content", type="primary", use_container_width=True)
 
+    if st.button("Refresh mailbox", use_container_width=True):
+        with st.spinner("Syncing..."):
+            mirror.sync()
+
     with st.expander("How to use"):
         st.markdown("""
             1. Enter your desired text
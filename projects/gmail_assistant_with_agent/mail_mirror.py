@@ -0,0 +1,337 @@
+"""
+Local SQLite mirror of the mailbox with an FTS5 index over sender, recipients, subject and body.
+The first sync lists the most recent messages; later syncs replay only the changes since the
+stored Gmail historyId. The agent's search/read/summarize tools answer from the mirror, and the
+API is used for sends, for messages the mirror does not have, and to catch up when it is stale.
+Searches with operators the mirror does not implement (after:, before:, has:, ...) go to Gmail's
+own search, and so do searches that find nothing locally while the mirror holds only the most
+recent MAX_MESSAGES of a larger mailbox.
+"""
+import base64
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from html import unescape
+
+from langchain_core.tools import tool
+
+MIRROR_PATH = os.getenv("GMAIL_MIRROR_PATH", "gmail_mirror.sqlite")
+MAX_MESSAGES = int(os.getenv("GMAIL_MIRROR_MAX_MESSAGES", "2000"))
+STALE_SECONDS = float(os.getenv("GMAIL_MIRROR_STALE_SECONDS", "120"))
+MAX_BODY_CHARS = 4000
+FILTER_RE = re.compile(r'(\w+):("[^"]*"|\S+)')
+LOCAL_OPERATORS = {"from", "to", "subject", "label", "in", "is"}
+#label:/in: values the mirror can match against labelIds; user labels are stored by id, not name
+SYSTEM_LABELS = {"INBOX", "SENT", "DRAFT", "SPAM", "TRASH", "UNREAD", "STARRED", "IMPORTANT", "CHAT",
+                 "CATEGORY_PERSONAL", "CATEGORY_SOCIAL", "CATEGORY_PROMOTIONS", "CATEGORY_UPDATES", "CATEGORY_FORUMS"}
+#is: values that are a label being present; is:read and the like are negations
+LOCAL_IS = {"unread", "starred", "important"}
+#Negation, boolean operators and grouping, which the mirror's AND-of-terms search cannot express
+API_SYNTAX_RE = re.compile(r'(?:^|\s)-|\b(?:OR|AND)\b|[{}()]')
+#Gmail tools that must keep going to the API
+API_TOOLS = {"create_gmail_draft", "send_gmail_message"}
+
+
+def _decode(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)).decode("utf-8", errors="replace")
+
+
+def _body(payload):
+    """Plain-text body, falling back to tag-stripped HTML."""
+    plain, html = [], []
+    stack = [payload]
+    while stack:
+        part = stack.pop(0)
+        data = part.get("body", {}).get("data")
+        if data and part.get("mimeType") == "text/plain":
+            plain.append(_decode(data))
+        elif data and part.get("mimeType") == "text/html":
+            html.append(_decode(data))
+        stack.extend(part.get("parts", []))
+    if plain:
+        return "\n".join(plain)
+    text = re.sub(r"<(script|style)[^>]*>.*?</\1>|<[^>]+>", " ", "\n".join(html), flags=re.S | re.I)
+    return " ".join(unescape(text).split())
+
+
+def parse_message(message):
+    headers = {h["name"].lower(): h["value"] for h in message.get("payload", {}).get("headers", [])}
+    try:
+        date = parsedate_to_datetime(headers["date"]).isoformat()
+    except (KeyError, TypeError, ValueError):
+        date = None
+    return {
+        "id": message["id"],
+        "thread_id": message.get("threadId"),
+        "internal_date": int(message.get("internalDate", 0)),
+        "date": date,
+        "sender": headers.get("from", ""),
+        "recipients": ", ".join(filter(None, (headers.get("to"), headers.get("cc")))),
+        "subject": headers.get("subject", ""),
+        "snippet": unescape(message.get("snippet", "")),
+        "body": _body(message.get("payload", {})),
+        "labels": " ".join(message.get("labelIds", [])),
+    }
+
+
+def local_filters(query):
+    """The query's (operator, value) filters when the mirror can answer it exactly, else None."""
+    if API_SYNTAX_RE.search(query):
+        return None
+    filters = [(key.lower(), value.strip('"')) for key, value in FILTER_RE.findall(query)]
+    for key, value in filters:
+        if key not in LOCAL_OPERATORS:
+            return None
+        if key == "is" and value.lower() not in LOCAL_IS:
+            return None
+        if key in ("label", "in") and value.upper() not in SYSTEM_LABELS:
+            return None
+    #A quoted phrase would become separate terms locally
+    if '"' in FILTER_RE.sub(" ", query):
+        return None
+    return filters
+
+
+def _is_not_found(err):
+    return getattr(getattr(err, "resp", None), "status", None) == 404
+
+
+class MailMirror:
+    def __init__(self, service, path=MIRROR_PATH, max_messages=MAX_MESSAGES, stale_seconds=STALE_SECONDS):
+        self.service = service
+        self.max_messages = max_messages
+        self.stale_seconds = stale_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id TEXT PRIMARY KEY, thread_id TEXT, internal_date INTEGER, date TEXT, sender TEXT,
+                recipients TEXT, subject TEXT, snippet TEXT, body TEXT, labels TEXT);
+            CREATE INDEX IF NOT EXISTS messages_by_date ON messages (internal_date DESC);
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                sender, recipients, subject, body, content='messages', content_rowid='rowid');
+            CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts (rowid, sender, recipients, subject, body)
+                VALUES (new.rowid, new.sender, new.recipients, new.subject, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, sender, recipients, subject, body)
+                VALUES ('delete', old.rowid, old.sender, old.recipients, old.subject, old.body);
+            END;
+            CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self._conn.commit()
+        self._lock = threading.RLock()
+        self.stats = {"full_syncs": 0, "incremental_syncs": 0, "api_gets": 0, "api_searches": 0, "local_reads": 0}
+
+    def _state(self, key):
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _fetch(self, message_id):
+        self.stats["api_gets"] += 1
+        return self.service.users().messages().get(userId="me", id=message_id, format="full").execute()
+
+    def _store(self, message):
+        row = parse_message(message)
+        #Delete then insert, so the FTS triggers see the old row go and the new one arrive
+        self._conn.execute("DELETE FROM messages WHERE id = ?", (row["id"],))
+        self._conn.execute(
+            f"INSERT INTO messages ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", list(row.values()))
+
+    def full_sync(self):
+        users = self.service.users()
+        #Take the history id first: changes made during the listing are replayed by the next sync
+        history_id = users.getProfile(userId="me").execute()["historyId"]
+        ids, page_token = [], None
+        while len(ids) < self.max_messages:
+            response = users.messages().list(userId="me", maxResults=min(500, self.max_messages - len(ids)),
+                                             pageToken=page_token).execute()
+            ids.extend(message["id"] for message in response.get("messages", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        known = {row[0] for row in self._conn.execute("SELECT id FROM messages")}
+        for message_id in known - set(ids):
+            self._conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+        #Known messages are fetched again too: their labels may have changed since the history expired
+        for message_id in ids:
+            self._store(self._fetch(message_id))
+        self._set_state("history_id", history_id)
+        #With a page left over, older mail exists that only the API can find
+        self._set_state("complete", int(not page_token))
+        self.stats["full_syncs"] += 1
+        print(f"---GMAIL MIRROR: full sync, {len(ids)} messages---")
+
+    def incremental_sync(self, history_id):
+        history = self.service.users().history()
+        changed, deleted, page_token = set(), set(), None
+        while True:
+            response = history.list(userId="me", startHistoryId=history_id, pageToken=page_token).execute()
+            for record in response.get("history", []):
+                for key in ("messagesAdded", "labelsAdded", "labelsRemoved"):
+                    changed.update(item["message"]["id"] for item in record.get(key, []))
+                for item in record.get("messagesDeleted", []):
+                    deleted.add(item["message"]["id"])
+            latest = response.get("historyId", history_id)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        for message_id in deleted:
+            self._conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+        for message_id in changed - deleted:
+            try:
+                self._store(self._fetch(message_id))
+            except Exception as err:
+                #Added and then deleted between syncs
+                if not _is_not_found(err):
+                    raise
+        self._set_state("history_id", latest)
+        self.stats["incremental_syncs"] += 1
+        if changed or deleted:
+            print(f"---GMAIL MIRROR: {len(changed - deleted)} changed, {len(deleted)} deleted---")
+
+    def sync(self):
+        with self._lock:
+            history_id = self._state("history_id")
+            try:
+                if history_id is None:
+                    self.full_sync()
+                else:
+                    self.incremental_sync(history_id)
+            except Exception as err:
+                #Gmail keeps history for about a week; an older id answers 404 and needs a full sync
+                if history_id is None or not _is_not_found(err):
+                    raise
+                print("---GMAIL MIRROR: history expired, running a full sync---")
+                self.full_sync()
+            self._set_state("synced_at", time.time())
+            self._conn.commit()
+
+    def ensure_fresh(self):
+        synced_at = self._state("synced_at")
+        if synced_at is None or time.time() - float(synced_at) > self.stale_seconds:
+            self.sync()
+
+    def search(self, query="", limit=10):
+        """
+        Full-text search plus the common Gmail operators: from:, to:, subject:, and label:/in:/is:
+        for system labels (e.g. in:inbox, is:unread). Anything else - other operators, user label
+        names, negation, OR/AND, grouping, quoted phrases - and misses while the mirror does not
+        hold the whole mailbox are answered by the Gmail API instead.
+        """
+        filters = local_filters(query)
+        if filters is None:
+            return self.api_search(query, limit)
+        self.ensure_fresh()
+        results = self._local_search(query, filters, limit)
+        if not results and query.strip() and self._state("complete") != "1":
+            return self.api_search(query, limit)
+        return results
+
+    def _local_search(self, query, filters, limit):
+        where, params = [], []
+        for key, value in filters:
+            if key in ("from", "to", "subject"):
+                column = {"from": "sender", "to": "recipients", "subject": "subject"}[key]
+                where.append(f"m.{column} LIKE ?")
+                params.append(f"%{value}%")
+            elif key in ("label", "in", "is"):
+                where.append("(' ' || m.labels || ' ') LIKE ?")
+                params.append(f"% {value.upper()} %")
+        terms = FILTER_RE.sub(" ", query).split()
+        sql = "SELECT m.id, m.date, m.sender, m.subject, m.snippet FROM messages m"
+        if terms:
+            #Each term quoted, so user text never reaches FTS5 as query syntax
+            sql += " JOIN messages_fts f ON f.rowid = m.rowid"
+            where.insert(0, "messages_fts MATCH ?")
+            params.insert(0, " ".join('"' + term.replace('"', '""') + '"' for term in terms))
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ("bm25(messages_fts), " if terms else "") + "m.internal_date DESC LIMIT ?"
+        with self._lock:
+            self.stats["local_reads"] += 1
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [dict(zip(("id", "date", "from", "subject", "snippet"), row)) for row in rows]
+
+    def api_search(self, query, limit=10):
+        """Gmail's own search. Matches are stored in the mirror, so reading them afterwards is local."""
+        response = self.service.users().messages().list(userId="me", q=query, maxResults=limit).execute()
+        results = []
+        with self._lock:
+            self.stats["api_searches"] += 1
+            for item in response.get("messages", []):
+                sql = "SELECT id, date, sender, subject, snippet FROM messages WHERE id = ?"
+                row = self._conn.execute(sql, (item["id"],)).fetchone()
+                if row is None:
+                    try:
+                        self._store(self._fetch(item["id"]))
+                    except Exception as err:
+                        #Deleted between the list and the get
+                        if not _is_not_found(err):
+                            raise
+                        continue
+                    row = self._conn.execute(sql, (item["id"],)).fetchone()
+                results.append(dict(zip(("id", "date", "from", "subject", "snippet"), row)))
+            self._conn.commit()
+        return results
+
+    def get(self, message_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, thread_id, date, sender, recipients, subject, body, labels FROM messages WHERE id = ?",
+                (message_id,)).fetchone()
+            if row is None:
+                self._store(self._fetch(message_id))
+                self._conn.commit()
+                return self.get(message_id)
+            self.stats["local_reads"] += 1
+        message = dict(zip(("id", "thread_id", "date", "from", "to", "subject", "body", "labels"), row))
+        message["body"] = message["body"][:MAX_BODY_CHARS]
+        return message
+
+    def thread(self, thread_id):
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM messages WHERE thread_id = ? ORDER BY internal_date", (thread_id,))]
+        return [self.get(message_id) for message_id in ids]
+
+
+def mirror_tools(mirror):
+    """Search, read and summarize tools that answer from the mirror instead of the Gmail API."""
+
+    @tool
+    def search_mail(query: str, max_results: int = 10) -> str:
+        """
+        Search the mailbox. Accepts free text and Gmail search operators (from:, to:, subject:,
+        in:inbox, is:unread, label:, after:, before:, has:attachment, ...). An empty query lists
+        the most recent messages. Returns id, date, sender, subject and snippet.
+        """
+        return json.dumps(mirror.search(query, max_results), ensure_ascii=False)
+
+    @tool
+    def read_mail(message_id: str) -> str:
+        """Read one message by id: headers and plain-text body."""
+        return json.dumps(mirror.get(message_id), ensure_ascii=False)
+
+    @tool
+    def read_thread(thread_id: str) -> str:
+        """Read every message of a thread, oldest first."""
+        return json.dumps(mirror.thread(thread_id), ensure_ascii=False)
+
+    @tool
+    def summarize_mailbox(query: str = "in:inbox", max_results: int = 20) -> str:
+        """
+        Compact digest (sender, subject, snippet, one line each) of the messages matching a search,
+        for summarizing many emails at once without reading every body.
+        """
+        return "\n".join(f"{m['date'] or ''} | {m['from']} | {m['subject']} | {m['snippet']}"
+                         for m in mirror.search(query, max_results))
+
+    return [search_mail, read_mail, read_thread, summarize_mailbox]
@@ -0,0 +1,85 @@
+"""
+Batch mode for the SQL agent: every line of the questions file is asked once, with at most
+--workers questions in flight. All runs share the compiled graph and the schema catalog, which
+is loaded once before the batch starts. Writes one JSON line per question with the answer, the
+SQL that produced it, latency and the number of LLM calls it took.
+
+    python batch_questions.py questions.txt --out answers.jsonl --workers 8
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from concurrent_runner import final_answer
+from sql_agent_with_langgraph import app, schema_catalog
+from sql_memory import last_successful_sql
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.calls += 1
+
+
+async def ask(question, limiter):
+    async with limiter:
+        counter = LLMCallCounter()
+        started = time.perf_counter()
+        try:
+            response = await app.ainvoke({"messages": [("user", question)]}, config={"callbacks": [counter]})
+            answer, sql, error = final_answer(response), last_successful_sql(response["messages"]), None
+        except Exception as err:
+            answer, sql, error = None, None, repr(err)
+        return {"question": question, "answer": answer, "sql": sql, "error": error,
+                "seconds": round(time.perf_counter() - started, 3), "llm_calls": counter.calls}
+
+
+async def arun_batch(questions, out_path, workers=8):
+    #Load the schema once up front rather than racing the first workers to build it
+    schema_catalog.refresh()
+    limiter = asyncio.Semaphore(workers)
+    results = []
+    with open(out_path, "w", encoding="utf-8") as out:
+        for task in asyncio.as_completed([ask(question, limiter) for question in questions]):
+            result = await task
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            results.append(result)
+            print(f"[{len(results)}/{len(questions)}] {result['seconds']:.2f}s {result['llm_calls']} LLM calls  {result['question']}")
+    return results
+
+
+def report(results, elapsed):
+    seconds = sorted(result["seconds"] for result in results)
+    calls = [result["llm_calls"] for result in results]
+    failed = sum(1 for result in results if result["error"])
+    print(f"\n{len(results)} questions in {elapsed:.1f}s, {failed} failed")
+    print(f"latency p50 {statistics.median(seconds):.2f}s  p95 {seconds[int(0.95 * (len(seconds) - 1))]:.2f}s  max {seconds[-1]:.2f}s")
+    print(f"LLM calls total {sum(calls)}  mean {statistics.mean(calls):.1f}  max {max(calls)}")
+    print("Most expensive questions:")
+    for result in sorted(results, key=lambda r: (r["llm_calls"], r["seconds"]), reverse=True)[:5]:
+        print(f"  {result['llm_calls']:>2} calls {result['seconds']:6.2f}s  {result['question']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("questions_file", help="one question per line")
+    parser.add_argument("--out", default="answers.jsonl")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with open(args.questions_file, encoding="utf-8") as f:
+        questions = [line.strip() for line in f if line.strip()]
+    started = time.perf_counter()
+    results = asyncio.run(arun_batch(questions, args.out, args.workers))
+    if results:
+        report(results, time.perf_counter() - started)
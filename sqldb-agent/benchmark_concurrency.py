@@ -0,0 +1,60 @@
+"""
+Queries/sec as concurrency grows.
+
+    python benchmark_concurrency.py           # database layer only: read pool + QueryExecutor
+    python benchmark_concurrency.py --agent   # full agent runs, needs GROQ_API_KEY
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from db_pool import ReadOnlyPool, enable_wal
+from sql_executor import QueryExecutor
+
+DB_PATH = "mydb.db"
+LEVELS = [1, 2, 4, 8, 16, 32]
+QUERIES = [
+    "SELECT first_name, last_name, salary FROM employees ORDER BY salary DESC LIMIT 5",
+    "SELECT c.first_name, SUM(o.amount) FROM customers c JOIN orders o ON o.customer_id = c.customer_id GROUP BY c.customer_id ORDER BY 2 DESC LIMIT 5",
+    "SELECT COUNT(*), AVG(amount) FROM orders",
+    "SELECT order_date, amount FROM orders WHERE amount > 200 ORDER BY order_date LIMIT 5",
+]
+QUESTIONS = [
+    "Tell me about all the orders",
+    "Which customer spent the most?",
+    "Who is the highest paid employee?",
+    "What is the average order amount?",
+]
+
+
+def bench_db(concurrency, total):
+    pool = ReadOnlyPool(DB_PATH, size=concurrency)
+    executor = QueryExecutor(DB_PATH, pool=pool)
+    with ThreadPoolExecutor(max_workers=concurrency) as threads:
+        started = time.perf_counter()
+        list(threads.map(executor.run, (QUERIES[i % len(QUERIES)] for i in range(total))))
+        elapsed = time.perf_counter() - started
+    pool.close()
+    return total / elapsed
+
+
+def bench_agent(concurrency, total):
+    from concurrent_runner import run_questions
+    started = time.perf_counter()
+    run_questions([QUESTIONS[i % len(QUESTIONS)] for i in range(total)], concurrency)
+    return total / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agent", action="store_true")
+    parser.add_argument("--total", type=int, default=0, help="runs per level (default 2000 queries or 4 questions per worker)")
+    args = parser.parse_args()
+
+    enable_wal(DB_PATH)
+    for level in LEVELS:
+        if args.agent:
+            rate = bench_agent(level, args.total or level * 4)
+        else:
+            rate = bench_db(level, args.total or 2000)
+        print(f"concurrency {level:>2}: {rate:8.1f} {'questions' if args.agent else 'queries'}/sec")
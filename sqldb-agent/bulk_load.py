@@ -0,0 +1,227 @@
+"""
+Bulk loader for the SQL agent database. Creates the schema if it is missing, then replaces the
+contents of employees, customers and orders with CSV files or a deterministic synthetic dataset.
+A load whose source fingerprint matches the last successful load is skipped.
+
+    python bulk_load.py --generate --customers 1000000 --orders 5000000 --employees 10000
+    python bulk_load.py --csv-dir data/    # employees.csv, customers.csv, orders.csv with header rows
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+DB_PATH = "mydb.db"
+BATCH_ROWS = 50000
+
+table_creation_queries = [
+    """
+CREATE TABLE IF NOT EXISTS employees (
+    emp_id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    hire_date TEXT NOT NULL,
+    salary REAL NOT NULL
+);
+""",
+    """
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    phone TEXT
+);
+""",
+    """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL,
+    order_date TEXT NOT NULL,
+    amount REAL NOT NULL,
+    FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
+);
+""",
+]
+
+#Built after every load; orders.customer_id is the join and filter column for most questions
+LOAD_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders (customer_id)",
+]
+
+TABLE_COLUMNS = {
+    "employees": ["emp_id", "first_name", "last_name", "email", "hire_date", "salary"],
+    "customers": ["customer_id", "first_name", "last_name", "email", "phone"],
+    "orders": ["order_id", "customer_id", "order_date", "amount"],
+}
+#Parents before children so the foreign key always points at a loaded row
+LOAD_ORDER = ["employees", "customers", "orders"]
+
+FIRST_NAMES = ["John", "Jane", "Emily", "Michael", "Sunny", "Arhun", "Alice", "Bob", "Priya", "Wei", "Carlos",
+               "Fatima", "Olga", "Kenji", "Amara", "Liam", "Noah", "Mia", "Sofia", "Omar"]
+LAST_NAMES = ["Doe", "Smith", "Davis", "Brown", "Savita", "Meheta", "Johnson", "Garcia", "Chen", "Khan",
+              "Ivanova", "Tanaka", "Okafor", "Murphy", "Rossi", "Novak", "Silva", "Cohen", "Ali", "Lee"]
+DOMAINS = ["example.com", "gmail.com", "abc.com", "jpg.com", "uio.com"]
+
+
+def create_schema(conn):
+    for query in table_creation_queries:
+        conn.execute(query)
+    conn.execute("CREATE TABLE IF NOT EXISTS load_manifest (id INTEGER PRIMARY KEY CHECK (id = 1), fingerprint TEXT, rows TEXT, loaded_at REAL)")
+
+
+def generate_rows(employees, customers, orders, seed=42):
+    """Deterministic synthetic rows per table; each table is a lazy generator so millions of rows stream."""
+    start = date(2018, 1, 1)
+
+    def employee_rows():
+        rng = random.Random(f"{seed}-employees")
+        for emp_id in range(1, employees + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield (emp_id, first, last, f"{first}.{last}.{emp_id}@{rng.choice(DOMAINS)}".lower(),
+                   (start + timedelta(days=rng.randrange(2500))).isoformat(), round(rng.uniform(35000, 180000), 2))
+
+    def customer_rows():
+        rng = random.Random(f"{seed}-customers")
+        for customer_id in range(1, customers + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield (customer_id, first, last, f"{first}.{last}.{customer_id}@{rng.choice(DOMAINS)}".lower(),
+                   f"{rng.randrange(10**9, 10**10)}")
+
+    def order_rows():
+        rng = random.Random(f"{seed}-orders")
+        for order_id in range(1, orders + 1):
+            #Mostly uniform, with a heavy tail of low ids that order far more than others
+            if rng.random() < 0.8:
+                customer_id = rng.randrange(1, customers + 1)
+            else:
+                customer_id = min(customers, int(rng.paretovariate(1.2)))
+            yield (order_id, customer_id, (start + timedelta(days=rng.randrange(2500))).isoformat(),
+                   round(rng.lognormvariate(4.5, 0.8), 2))
+
+    return {"employees": employee_rows(), "customers": customer_rows(), "orders": order_rows()}
+
+
+def csv_rows(csv_dir):
+    def rows(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            yield from reader
+
+    return {table: rows(os.path.join(csv_dir, f"{table}.csv")) for table in LOAD_ORDER}
+
+
+def csv_fingerprint(csv_dir):
+    digest = hashlib.sha256()
+    for table in LOAD_ORDER:
+        with open(os.path.join(csv_dir, f"{table}.csv"), "rb") as f:
+            while block := f.read(1 << 20):
+                digest.update(block)
+    return f"csv:{digest.hexdigest()}"
+
+
+def secondary_indexes(conn):
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN (?, ?, ?)",
+        LOAD_ORDER,
+    ).fetchall()
+
+
+def load(conn, sources, fingerprint, force=False):
+    create_schema(conn)
+    conn.commit()
+    current = conn.execute("SELECT fingerprint FROM load_manifest WHERE id = 1").fetchone()
+    if current and current[0] == fingerprint and not force:
+        print(f"---BULK LOAD: data already current ({fingerprint}), skipping---")
+        return None
+
+    #Durability is traded for speed: a crashed load is simply re-run
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.execute("PRAGMA foreign_keys=OFF")
+    conn.execute("BEGIN")
+
+    #Drop secondary indexes and build them once after the rows are in instead of updating them per row
+    indexes = secondary_indexes(conn)
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX "{name}"')
+    counts = {}
+    started = time.perf_counter()
+    for table in reversed(LOAD_ORDER):
+        conn.execute(f"DELETE FROM {table}")
+    for table in LOAD_ORDER:
+        columns = TABLE_COLUMNS[table]
+        insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        rows = iter(sources[table])
+        counts[table] = 0
+        while batch := list(islice(rows, BATCH_ROWS)):
+            conn.executemany(insert, batch)
+            counts[table] += len(batch)
+        print(f"---BULK LOAD: {table} {counts[table]} rows ({time.perf_counter() - started:.1f}s)---")
+    conn.commit()
+
+    #The manifest is written after the indexes, so a load that dies before them is not skipped next time
+    conn.execute("BEGIN")
+    for _, sql in indexes:
+        conn.execute(sql)
+    for sql in LOAD_INDEXES:
+        conn.execute(sql)
+    built = len(secondary_indexes(conn))
+    conn.execute(
+        "INSERT OR REPLACE INTO load_manifest (id, fingerprint, rows, loaded_at) VALUES (1, ?, ?, ?)",
+        (fingerprint, json.dumps(counts), time.time()),
+    )
+    conn.commit()
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("ANALYZE")
+    conn.commit()
+    print(f"---BULK LOAD: done in {time.perf_counter() - started:.1f}s, {built} indexes built---")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--csv-dir")
+    parser.add_argument("--generate", action="store_true")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--orders", type=int, default=500000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="reload even if the data is already current")
+    args = parser.parse_args()
+
+    if bool(args.csv_dir) == args.generate:
+        parser.error("pass exactly one of --csv-dir or --generate")
+    if min(args.employees, args.customers, args.orders) < 0:
+        parser.error("--employees, --customers and --orders cannot be negative")
+    if args.generate and args.orders and not args.customers:
+        parser.error("--orders needs at least one customer to point at")
+    if args.generate:
+        sources = generate_rows(args.employees, args.customers, args.orders, args.seed)
+        fingerprint = "generated:" + json.dumps(
+            {"employees": args.employees, "customers": args.customers, "orders": args.orders, "seed": args.seed},
+            sort_keys=True)
+    else:
+        sources = csv_rows(args.csv_dir)
+        fingerprint = csv_fingerprint(args.csv_dir)
+
+    conn = sqlite3.connect(args.db, isolation_level="DEFERRED")
+    try:
+        load(conn, sources, fingerprint, force=args.force)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Runs many questions through the compiled SQL agent at once.
+
+    python concurrent_runner.py "How many orders are there?" "Who earns the most?" --concurrency 8
+"""
+import argparse
+import asyncio
+import time
+
+from sql_agent_with_langgraph import app
+
+
+def final_answer(response):
+    message = response["messages"][-1]
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        if tool_call["name"] == "SubmitFinalAnswer":
+            return tool_call["args"]["final_answer"]
+    return message.content
+
+
+async def ask(question, limiter):
+    async with limiter:
+        started = time.perf_counter()
+        #Graph nodes are sync; ainvoke runs them in worker threads, which the read pool serves
+        response = await app.ainvoke({"messages": [("user", question)]})
+        return {"question": question, "answer": final_answer(response), "seconds": time.perf_counter() - started}
+
+
+async def arun_questions(questions, concurrency=8):
+    limiter = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(ask(question, limiter) for question in questions))
+
+
+def run_questions(questions, concurrency=8):
+    return asyncio.run(arun_questions(questions, concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("questions", nargs="+")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    for result in run_questions(args.questions, args.concurrency):
+        print(f"[{result['seconds']:.2f}s] {result['question']}\n{result['answer']}\n")
@@ -0,0 +1,74 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+POOL_SIZE = int(os.getenv("SQL_AGENT_POOL_SIZE", "8"))
+BUSY_TIMEOUT_MS = 5000
+
+
+def enable_wal(db_path):
+    """WAL lets readers run while the writer commits; the mode is stored in the database file."""
+    conn = sqlite3.connect(db_path)
+    try:
+        mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+    finally:
+        conn.close()
+    return mode
+
+
+class ReadOnlyPool:
+    """Fixed set of read-only connections handed out to one thread at a time."""
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(self._connect())
+
+    def _connect(self):
+        uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            #Never hand the next caller an open read transaction
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+class SingleWriter:
+    """The only read-write connection; transactions are serialized by a lock."""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        #synchronous is per connection, so it is set on the one that commits; NORMAL is safe under WAL
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,252 @@
+"""
+Index advisor driven by the agent's own workload. db_query_tool records every query it runs;
+this script replays EXPLAIN QUERY PLAN over them, finds repeated full-table scans and temp
+B-tree sorts, and proposes indexes. With --apply it creates them and reports the before/after
+latency of the recorded workload.
+
+    python index_advisor.py            # report and proposals only
+    python index_advisor.py --apply    # create the proposed indexes
+"""
+import argparse
+import atexit
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from query_cache import is_read_only, normalize_sql
+from sql_executor import QueryExecutor
+from sql_validator import tokenize
+
+DB_PATH = "mydb.db"
+WORKLOAD_PATH = "query_workload.sqlite"
+FLUSH_EVERY = 256
+FLUSH_SECONDS = 5.0
+#Older SQLite prints "SCAN TABLE orders AS o", newer versions only the alias: "SCAN o"
+SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$")
+TEMP_SORT_RE = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)")
+COMPARISON = {"=", "<", ">", "in", "between", "like", "is"}
+CLAUSE_WORDS = {"where", "group", "order", "limit", "having", "join", "on", "inner", "left", "union"}
+
+
+class WorkloadRecorder:
+    """
+    Counts every distinct query shape that db_query_tool answers, with one example and its latency.
+    Cache hits count as executions but carry no latency, so total_ms / timed is the database time.
+
+    record() only appends to an in-memory queue, so it stays cheap on the query-cache hit path.
+    A background thread normalizes and writes the queue in one transaction every flush_seconds,
+    or sooner once flush_every records are waiting, and once more at exit.
+    """
+
+    def __init__(self, path=WORKLOAD_PATH, flush_every=FLUSH_EVERY, flush_seconds=FLUSH_SECONDS):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS workload (template TEXT PRIMARY KEY, example TEXT, count INTEGER, timed INTEGER, total_ms REAL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run, name="workload-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def record(self, query, elapsed_ms=None):
+        self._pending.append((query, elapsed_ms))
+        if len(self._pending) >= self.flush_every:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            shapes = {}
+            for _ in range(len(self._pending)):
+                query, elapsed_ms = self._pending.popleft()
+                template = normalize_sql(query)[0]
+                if not is_read_only(template):
+                    continue
+                entry = shapes.setdefault(template, [query, 0, 0, 0.0])
+                entry[0] = query
+                entry[1] += 1
+                entry[2] += elapsed_ms is not None
+                entry[3] += elapsed_ms or 0.0
+            if not shapes:
+                return
+            self._conn.executemany(
+                "INSERT INTO workload (template, example, count, timed, total_ms) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(template) DO UPDATE SET example = excluded.example, count = count + excluded.count, "
+                "timed = timed + excluded.timed, total_ms = total_ms + excluded.total_ms",
+                [(template, *entry) for template, entry in shapes.items()],
+            )
+            self._conn.commit()
+
+    def queries(self):
+        self.flush()
+        with self._lock:
+            return self._conn.execute("SELECT example, count FROM workload ORDER BY count DESC").fetchall()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._flusher.join()
+        self.flush()
+
+
+def _resolve(tokens, schema):
+    """alias -> table for every table named after FROM or JOIN."""
+    aliases = {}
+    for i, (_, text) in enumerate(tokens[:-1]):
+        if text in ("from", "join") and tokens[i + 1][1] in schema:
+            table = tokens[i + 1][1]
+            aliases[table] = table
+            j = i + 2 + (i + 2 < len(tokens) and tokens[i + 2][1] == "as")
+            if j < len(tokens) and tokens[j][0] == "word" and tokens[j][1] not in CLAUSE_WORDS | {"as"}:
+                aliases[tokens[j][1]] = table
+    return aliases
+
+
+def _columns_in(tokens, start_words, stop_words, table, aliases, schema, comparisons_only):
+    """Columns of `table` referenced between a start keyword and the next clause keyword."""
+    found, active = [], False
+    for i, (kind, text) in enumerate(tokens):
+        if text in start_words:
+            active = True
+            continue
+        if text in stop_words:
+            active = False
+        if not active or kind != "word":
+            continue
+        qualified = i >= 2 and tokens[i - 1][1] == "."
+        owner = aliases.get(tokens[i - 2][1]) if qualified else (table if text in schema[table] else None)
+        if owner != table or text not in schema[table]:
+            continue
+        if comparisons_only and not (i + 1 < len(tokens) and tokens[i + 1][1] in COMPARISON):
+            continue
+        if text not in found:
+            found.append(text)
+    return found
+
+
+class IndexAdvisor:
+    def __init__(self, db_path=DB_PATH):
+        self.conn = sqlite3.connect(db_path)
+        #Timing goes through the agent's executor, so it has the same time limit and row cap
+        self.executor = QueryExecutor(db_path)
+        self.schema = {}
+        self.indexed = set()
+        for (table,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+            self.schema[table.lower()] = {row[1].lower() for row in self.conn.execute(f'PRAGMA table_info("{table}")')}
+            for row in self.conn.execute(f'PRAGMA table_info("{table}")'):
+                if row[5] == 1:
+                    self.indexed.add((table.lower(), row[1].lower()))
+            for index in self.conn.execute(f'PRAGMA index_list("{table}")'):
+                first = self.conn.execute(f'PRAGMA index_info("{index[1]}")').fetchone()
+                if first and first[2]:
+                    self.indexed.add((table.lower(), first[2].lower()))
+
+    def plan(self, query):
+        return [row[3] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+
+    def analyze(self, workload):
+        """Return {(table, columns): {"weight", "reasons"}} for indexes that would remove a scan or a sort."""
+        proposals = {}
+
+        def propose(table, columns, weight, reason):
+            columns = tuple(columns)
+            if not columns or (table, columns[0]) in self.indexed:
+                return
+            entry = proposals.setdefault((table, columns), {"weight": 0, "reasons": set()})
+            entry["weight"] += weight
+            entry["reasons"].add(reason)
+
+        for query, count in workload:
+            try:
+                details = self.plan(query)
+            except sqlite3.Error:
+                continue
+            tokens = tokenize(query)
+            aliases = _resolve(tokens, self.schema)
+            for detail in details:
+                scan = SCAN_RE.match(detail)
+                name = scan.group(1).lower() if scan else None
+                table = aliases.get(name) or (name if name in self.schema else None)
+                if table:
+                    joins = _columns_in(tokens, {"on"}, CLAUSE_WORDS - {"on"}, table, aliases, self.schema, True)
+                    filters = _columns_in(tokens, {"where"}, CLAUSE_WORDS - {"where"}, table, aliases, self.schema, True)
+                    for column in joins:
+                        propose(table, [column], count, f"full scan of {table} joined on {column}")
+                    if filters:
+                        propose(table, filters[:2], count, f"full scan of {table} filtered on {', '.join(filters[:2])}")
+                sort = TEMP_SORT_RE.search(detail)
+                if sort:
+                    clause = sort.group(1).lower()
+                    start = {"order"} if clause == "order by" else {"group"}
+                    for table in set(aliases.values()):
+                        columns = [c for c in _columns_in(tokens, start, {"limit", "having", "order"} - start,
+                                                          table, aliases, self.schema, False) if c != "by"]
+                        if columns:
+                            propose(table, columns[:3], count, f"temp B-tree for {clause.upper()} on {table}")
+        return proposals
+
+    def time_workload(self, workload, repeats=3):
+        """Best-of-repeats latency of the weighted workload in ms."""
+        total = 0.0
+        for query, count in workload:
+            best = float("inf")
+            for _ in range(repeats):
+                started = time.perf_counter()
+                self.executor.run(query)
+                best = min(best, time.perf_counter() - started)
+            total += best * count
+        return total * 1000
+
+    def create(self, proposals):
+        names = []
+        for table, columns in proposals:
+            name = f"idx_{table}_{'_'.join(columns)}"
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({", ".join(columns)})')
+            names.append(name)
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+        return names
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--workload", default=WORKLOAD_PATH)
+    parser.add_argument("--apply", action="store_true", help="create the proposed indexes and time the workload")
+    args = parser.parse_args()
+
+    workload = WorkloadRecorder(args.workload).queries()
+    advisor = IndexAdvisor(args.db)
+    proposals = advisor.analyze(workload)
+    print(f"{len(workload)} recorded query shapes, {sum(count for _, count in workload)} executions")
+    if not proposals:
+        print("No full scans or temp B-tree sorts that an index would fix.")
+        return
+    ranked = sorted(proposals.items(), key=lambda item: item[1]["weight"], reverse=True)
+    for (table, columns), entry in ranked:
+        print(f"CREATE INDEX ON {table} ({', '.join(columns)})  -- weight {entry['weight']}: {'; '.join(sorted(entry['reasons']))}")
+
+    if args.apply:
+        before = advisor.time_workload(workload)
+        names = advisor.create([key for key, _ in ranked])
+        after = advisor.time_workload(workload)
+        print(f"Created {', '.join(names)}")
+        print(f"Recorded workload: {before:.1f}ms before, {after:.1f}ms after ({before / after if after else float('inf'):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
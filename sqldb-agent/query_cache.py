@@ -0,0 +1,117 @@
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 512
+MAX_BYTES = 16 * 1024 * 1024
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<string>'(?:[^']|'')*')
+    |(?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+    |(?P<number>\d+\.\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?|\d+(?:[eE][+-]?\d+)?)
+    |(?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    |(?P<space>\s+)
+    |(?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def normalize_sql(query):
+    """
+    Return (template, literals): the query with comments and extra whitespace removed, keywords
+    and bare identifiers lower-cased and every literal replaced by ?, plus the literal values in order.
+    Queries that differ only in formatting share a template; different literal values do not
+    collide because the literals are part of the cache key.
+    """
+    parts, literals = [], []
+    for match in TOKEN_RE.finditer(query.strip().rstrip(";")):
+        kind, text = match.lastgroup, match.group()
+        if kind in ("comment", "space"):
+            continue
+        if kind == "string":
+            literals.append(("s", text[1:-1].replace("''", "'")))
+            parts.append("?")
+        elif kind == "number":
+            #Kept as written: 100 and 100.0 divide differently in SQLite
+            literals.append(("n", text.lower()))
+            parts.append("?")
+        elif kind == "quoted":
+            #Kept exact: SQLite reads a double-quoted token that names no column as a string literal
+            parts.append(text)
+        elif kind == "word":
+            parts.append(text.lower())
+        else:
+            parts.append(text)
+    return " ".join(parts), tuple(literals)
+
+
+def is_read_only(template):
+    return template.startswith(("select ", "with ", "explain ")) or template in ("select", "with")
+
+
+class QueryResultCache:
+    """
+    LRU cache of db_query_tool results keyed on normalize_sql(query). A dedicated connection polls
+    PRAGMA data_version, which changes whenever any other connection commits to the database,
+    and the whole cache is dropped when it moves. That includes writes made through the agent's own
+    connections, which are separate from the one polled here.
+    """
+
+    def __init__(self, db_path, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = self._current_version()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _current_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check_version(self):
+        version = self._current_version()
+        if version != self._version:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+            self.stats["invalidations"] += 1
+
+    def get(self, query):
+        key = normalize_sql(query)
+        with self._lock:
+            self._check_version()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._entries[key]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query, result):
+        key = normalize_sql(query)
+        if not is_read_only(key[0]):
+            return
+        size = len(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = result
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats["evictions"] += 1
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats, "entries": len(self._entries), "bytes": self._bytes,
+                    "hit_rate": self.stats["hits"] / lookups if lookups else 0.0}
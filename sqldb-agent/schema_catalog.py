@@ -0,0 +1,46 @@
+import threading
+
+from langchain_community.utilities import SQLDatabase
+from langchain_core.messages import AIMessage, ToolMessage
+from sqlalchemy import create_engine
+
+
+class SchemaCatalog:
+    """
+    Table list and CREATE TABLE / sample-row info for every usable table, built straight from
+    SQLDatabase. SQLite bumps PRAGMA schema_version on every schema change, so the catalog is
+    rebuilt only when that number moves. SQLDatabase lists and reflects the tables once, when it
+    is created, so each rebuild uses a new one.
+    """
+
+    def __init__(self, uri, **db_kwargs):
+        self.uri = uri
+        self.db_kwargs = db_kwargs
+        self._engine = create_engine(uri)
+        self.version = None
+        self.tables = []
+        self.table_info = ""
+        self._lock = threading.Lock()
+
+    def schema_version(self):
+        with self._engine.connect() as conn:
+            return conn.exec_driver_sql("PRAGMA schema_version").scalar()
+
+    def refresh(self):
+        version = self.schema_version()
+        with self._lock:
+            if version != self.version:
+                print(f"---SCHEMA CATALOG: rebuilding for schema_version {version}---")
+                db = SQLDatabase.from_uri(self.uri, **self.db_kwargs)
+                self.tables = sorted(db.get_usable_table_names())
+                self.table_info = db.get_table_info(self.tables)
+                self.version = version
+        return self
+
+    def as_messages(self):
+        """The same tool call / tool result pair the list-tables and get-schema hops end with."""
+        call_id = f"schema_catalog_{self.version}"
+        return [
+            AIMessage(content="", tool_calls=[{"name": "sql_db_schema", "args": {"table_names": ", ".join(self.tables)}, "id": call_id}]),
+            ToolMessage(content=self.table_info, tool_call_id=call_id),
+        ]
@@ -1,4 +1,3 @@
-import sqlite3
 from langchain_community.utilities import SQLDatabase
 from langchain_groq import ChatGroq
 from langchain_community.agent_toolkits import SQLDatabaseToolkit
@@ -11,56 +10,40 @@ warnings.filterwarnings("ignore")
 from typing import Annotated, Literal
 from langchain_core.messages import AIMessage
 from langchain_core.pydantic_v1 import BaseModel, Field
-from typing_extensions import TypedDict
+from typing_extensions import NotRequired, TypedDict
 from langgraph.graph import END, StateGraph, START
 from langgraph.graph.message import AnyMessage, add_messages
 from typing import Any
 from langchain_core.messages import ToolMessage
 from langchain_core.runnables import RunnableLambda, RunnableWithFallbacks
 from langgraph.prebuilt import ToolNode
+from schema_catalog import SchemaCatalog
+from query_cache import QueryResultCache
+from sql_validator import SQLValidator, extract_sql
+from sql_executor import QueryExecutor
+from db_pool import ReadOnlyPool, SingleWriter, enable_wal
+from bulk_load import create_schema
+from index_advisor import WorkloadRecorder
+from sql_memory import SQLMemory, examples_message, first_question, last_successful_sql
+from langchain_huggingface import HuggingFaceEmbeddings
 
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 
-connection = sqlite3.connect("mydb.db")
+#WAL so pooled readers never wait on the writer
+enable_wal("mydb.db")
+#The single read-write connection, used for seeding; agent queries use the read-only pool
+writer = SingleWriter("mydb.db")
+connection = writer.conn
 #print(connection)
 
-table_creation_query="""
-CREATE TABLE IF NOT EXISTS employees (
-    emp_id INTEGER PRIMARY KEY,
-    first_name TEXT NOT NULL,
-    last_name TEXT NOT NULL,
-    email TEXT UNIQUE NOT NULL,
-    hire_date TEXT NOT NULL,
-    salary REAL NOT NULL
-);
-"""
-table_creation_query2="""
-CREATE TABLE IF NOT EXISTS customers (
-    customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    first_name TEXT NOT NULL,
-    last_name TEXT NOT NULL,
-    email TEXT UNIQUE NOT NULL,
-    phone TEXT
-);
-"""
-table_creation_query3="""
-CREATE TABLE IF NOT EXISTS orders (
-    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    customer_id INTEGER NOT NULL,
-    order_date TEXT NOT NULL,
-    amount REAL NOT NULL,
-    FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
-);
-
-"""
-
 #Creating cursor to create table in database
 cursor = connection.cursor()
 
-cursor.execute(table_creation_query)
-cursor.execute(table_creation_query2)
-cursor.execute(table_creation_query3)
+#Schema lives in bulk_load.py; use that script to load CSVs or large synthetic datasets
+create_schema(connection)
 
 insert_query = """
 INSERT INTO employees (emp_id, first_name, last_name, email, hire_date, salary)
@@ -97,23 +80,12 @@ orders_data = [
     (4, 4, "2023-12-02", 450.00),
 ]
 
-#For testing purposes
-delete_query_employees = """
-DELETE FROM employees
-"""
-delete_query_customers = """
-DELETE FROM customers
-"""
-delete_query_orders = """
-DELETE FROM orders
-"""
-cursor.execute(delete_query_employees)
-cursor.execute(delete_query_customers)
-cursor.execute(delete_query_orders)
-
-cursor.executemany(insert_query,employee_data)
-cursor.executemany(insert_query_customers,customers_data)
-cursor.executemany(insert_query_orders,orders_data)
+#Seed the sample rows only into an empty database, never wipe existing data
+if cursor.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 0:
+    cursor.executemany(insert_query,employee_data)
+if cursor.execute("SELECT COUNT(*) FROM customers").fetchone()[0] == 0:
+    cursor.executemany(insert_query_customers,customers_data)
+    cursor.executemany(insert_query_orders,orders_data)
 
 connection.commit()
 
@@ -125,7 +97,8 @@ cursor.execute("SELECT * FROM employees;")
 #     print(row)
 
 #Loading Database
-db=SQLDatabase.from_uri("sqlite:///mydb.db")
+#load_manifest is bulk_load.py bookkeeping, not something the agent should query
+db=SQLDatabase.from_uri("sqlite:///mydb.db", ignore_tables=["load_manifest"])
 
 load_dotenv()
 
@@ -142,6 +115,19 @@ list_table_tools=next((tool for tool in tools if tool.name=="sql_db_list_tables"
 get_schema_tool = next((tool for tool in tools if tool.name == "sql_db_schema"), None)
 #print(get_schema_tool.invoke("customers"))
 
+#Parses, schema-checks and EXPLAINs generated SQL so most queries skip the LLM checker
+sql_validator=SQLValidator("mydb.db")
+
+#Time-limited, row-capped execution with a compact tabular result
+read_pool=ReadOnlyPool("mydb.db")
+query_executor=QueryExecutor("mydb.db", pool=read_pool)
+
+#Results keyed on normalized SQL, dropped whenever PRAGMA data_version changes
+query_cache=QueryResultCache("mydb.db")
+
+#Every answered query shape, cached or executed, is recorded for index_advisor.py
+workload_recorder=WorkloadRecorder()
+
 @tool
 def db_query_tool(query:str) -> str:
     """
@@ -150,9 +136,19 @@ def db_query_tool(query:str) -> str:
     In case of an error, the user is advised to rewrite the query and try again.
     """
 
-    result=db.run_no_throw(query)
+    cached=query_cache.get(query)
+    if cached is not None:
+        #Still part of the workload the advisor tunes for, without a latency; record() only queues it
+        workload_recorder.record(query)
+        return cached
+    started=time.perf_counter()
+    result=query_executor.run(query)
+    if not result.startswith("Error:"):
+        workload_recorder.record(query, (time.perf_counter()-started)*1000)
     if not result:
         return "Error: Query failed. Please rewrite your query and try again."
+    if not result.startswith("Error:"):
+        query_cache.put(query, result)
     return result
 
 #Without llm model
@@ -182,7 +178,8 @@ query_check_prompt = ChatPromptTemplate.from_messages([("system", query_check_sy
 
 query_check = query_check_prompt | llm.bind_tools([db_query_tool])
 
-query_check.invoke({"messages": [("user", "SELECT * FROM Employees LIMIT 5;")]})
+#Testing the query checker
+#query_check.invoke({"messages": [("user", "SELECT * FROM Employees LIMIT 5;")]})
 
 class SubmitFinalAnswer(BaseModel):
     """Submit the final answer to the user based on the query results."""
@@ -215,12 +212,44 @@ If you have enough information to answer the input question, simply invoke the a
 DO NOT make any DML statements (INSERT, UPDATE, DELETE, DROP etc.) to the database. Do not return any sql query except answer."""
 
 
-query_gen_prompt = ChatPromptTemplate.from_messages([("system", query_gen_system), ("placeholder", "{messages}")])
+query_gen_prompt = ChatPromptTemplate.from_messages([("system", query_gen_system), ("placeholder", "{examples}"), ("placeholder", "{messages}")])
 
 query_gen = query_gen_prompt | llm.bind_tools([SubmitFinalAnswer])
 
 class State(TypedDict):
     messages: Annotated[list[AnyMessage], add_messages]
+    schema_version: NotRequired[int]
+    validation: NotRequired[str]
+    examples: NotRequired[list[AnyMessage]]
+    recalled_sql: NotRequired[str]
+
+#Built from a fresh SQLDatabase, rebuilt only when PRAGMA schema_version changes
+schema_catalog = SchemaCatalog("sqlite:///mydb.db", ignore_tables=["load_manifest"])
+
+#Questions answered before under the same schema_version reuse their SQL or serve as few-shot examples
+sql_memory = SQLMemory(HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"))
+
+def route_start(state:State) -> Literal["load_schema", "first_tool_call"]:
+    try:
+        schema_catalog.refresh()
+        return "load_schema"
+    except Exception as err:
+        print(f"---SCHEMA CATALOG UNAVAILABLE ({err!r}), discovering schema with the LLM---")
+        return "first_tool_call"
+def load_schema(state:State) -> dict:
+    return {"messages": schema_catalog.as_messages(), "schema_version": schema_catalog.version}
+def recall_query(state:State) -> dict:
+    sql, examples = sql_memory.recall(first_question(state["messages"]), state["schema_version"])
+    if sql:
+        print("---SQL MEMORY: reusing stored query---")
+        call = AIMessage(content="", tool_calls=[{"name": "db_query_tool", "args": {"query": sql}, "id": f"memory_{uuid.uuid4().hex[:12]}"}])
+        return {"messages": [call], "recalled_sql": sql}
+    if examples:
+        print(f"---SQL MEMORY: {len(examples)} similar questions as examples---")
+        return {"examples": [examples_message(examples)]}
+    return {}
+def route_recall(state:State) -> Literal["execute_query", "query_gen"]:
+    return "execute_query" if state.get("recalled_sql") else "query_gen"
 def first_tool_call(state:State)->dict[str,list[AIMessage]]:
     return{"messages": [AIMessage(content="",tool_calls=[{"name":"sql_db_list_tables","args":{},"id":"tool_abcd123"}])]}
 def handle_tool_error(state:State) -> dict:
@@ -250,8 +279,12 @@ def query_gen_node(state: State):
                 )
     else:
         tool_messages = []
+    if "schema_version" in state and any(tc["name"] == "SubmitFinalAnswer" for tc in message.tool_calls):
+        sql = last_successful_sql(state["messages"])
+        if sql:
+            sql_memory.remember(first_question(state["messages"]), sql, state["schema_version"])
     return {"messages": [message] + tool_messages}
-def should_continue(state: State) -> Literal[END, "correct_query", "query_gen"]:
+def should_continue(state: State) -> Literal[END, "validate_query", "query_gen"]:
     messages = state["messages"]
     last_message = messages[-1]
     if getattr(last_message, "tool_calls", None):
@@ -259,7 +292,24 @@ def should_continue(state: State) -> Literal[END, "correct_query", "query_gen"]:
     if last_message.content.startswith("Error:"):
         return "query_gen"
     else:
-        return "correct_query"
+        return "validate_query"
+def validate_query_node(state: State) -> dict:
+    """
+    Check the generated query locally. Valid queries become a db_query_tool call, invalid ones an
+    error for query_gen, and only ambiguous ones go on to the LLM checker.
+    """
+    sql = extract_sql(state["messages"][-1].content)
+    status, detail = sql_validator.validate(sql)
+    print(f"---VALIDATE QUERY: {status}{'' if status == 'ok' else f' ({detail})'}---")
+    if status == "escalate":
+        return {"validation": status}
+    call_id = f"validate_{uuid.uuid4().hex[:12]}"
+    call = AIMessage(content="", tool_calls=[{"name": "db_query_tool", "args": {"query": sql or ""}, "id": call_id}])
+    if status == "ok":
+        return {"messages": [call], "validation": status}
+    return {"messages": [call, ToolMessage(content=detail, tool_call_id=call_id)], "validation": status}
+def route_validation(state: State) -> Literal["execute_query", "correct_query", "query_gen"]:
+    return {"ok": "execute_query", "escalate": "correct_query"}.get(state.get("validation"), "query_gen")
 def model_check_query(state: State) -> dict[str, list[AIMessage]]:
     """
     Use this tool to double-check if your query is correct before executing it.
@@ -267,26 +317,33 @@ def model_check_query(state: State) -> dict[str, list[AIMessage]]:
     return {"messages": [query_check.invoke({"messages": [state["messages"][-1]]})]}
     
 workflow = StateGraph(State)
+workflow.add_node("load_schema", load_schema)
+workflow.add_node("recall_query", recall_query)
 workflow.add_node("first_tool_call",first_tool_call)
 workflow.add_node("list_tables_tool", create_tool_node_with_fallback([list_table_tools]))
 workflow.add_node("get_schema_tool", create_tool_node_with_fallback([get_schema_tool]))
 model_get_schema = llm.bind_tools([get_schema_tool])
 workflow.add_node("model_get_schema",lambda state: {"messages": [model_get_schema.invoke(state["messages"])],},)
 workflow.add_node("query_gen", query_gen_node)
+workflow.add_node("validate_query", validate_query_node)
 workflow.add_node("correct_query", model_check_query)
 workflow.add_node("execute_query", create_tool_node_with_fallback([db_query_tool]))
 
-workflow.add_edge(START, "first_tool_call")
+workflow.add_conditional_edges(START, route_start)
+workflow.add_edge("load_schema", "recall_query")
+workflow.add_conditional_edges("recall_query", route_recall)
 workflow.add_edge("first_tool_call", "list_tables_tool")
 workflow.add_edge("list_tables_tool", "model_get_schema")
 workflow.add_edge("model_get_schema", "get_schema_tool")
 workflow.add_edge("get_schema_tool", "query_gen")
 workflow.add_conditional_edges("query_gen",should_continue,)
+workflow.add_conditional_edges("validate_query", route_validation)
 workflow.add_edge("correct_query", "execute_query")
 workflow.add_edge("execute_query", "query_gen")
 
 app=workflow.compile()
 
-query={"messages": [("user", "Tell me about all the orders")]}
-response = app.invoke(query)
-print(response["messages"][-1].tool_calls[0]["args"]["final_answer"])
\ No newline at end of file
+if __name__ == "__main__":
+    query={"messages": [("user", "Tell me about all the orders")]}
+    response = app.invoke(query)
+    print(response["messages"][-1].tool_calls[0]["args"]["final_answer"])
\ No newline at end of file
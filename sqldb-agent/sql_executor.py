@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import threading
+import time
+
+TIMEOUT_SECONDS = float(os.getenv("SQL_AGENT_TIMEOUT", "5"))
+MAX_ROWS = int(os.getenv("SQL_AGENT_MAX_ROWS", "50"))
+MAX_CELL_CHARS = 200
+FETCH_BATCH = 256
+#SQLite VM instructions between progress handler calls
+PROGRESS_STEPS = 10000
+
+
+def format_cell(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, float):
+        #repr round-trips exactly; only a whole number's ".0" is dropped
+        text = repr(value)
+        return text[:-2] if text.endswith(".0") else text
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    text = str(value).replace("\n", " ").replace("|", "\\|")
+    return text if len(text) <= MAX_CELL_CHARS else text[:MAX_CELL_CHARS] + "..."
+
+
+def encode_rows(columns, rows, total, complete):
+    """
+    Compact pipe-separated table: one header line, one line per row, then a footer with the row
+    count. Far fewer tokens than str() of a list of tuples, and the model sees when rows were cut.
+    """
+    lines = ["|".join(columns)]
+    lines.extend("|".join(format_cell(value) for value in row) for row in rows)
+    if len(rows) < total or not complete:
+        lines.append(f"[truncated: showing {len(rows)} of {total if complete else f'at least {total}'} rows]")
+    else:
+        lines.append(f"[{total} rows]")
+    return "\n".join(lines)
+
+
+class QueryExecutor:
+    """
+    Runs agent queries on a read-only connection with a wall-clock limit enforced by SQLite's
+    progress handler. Rows are streamed from the cursor: at most max_rows are kept, the rest
+    are only counted, and counting also stops at the deadline.
+    """
+
+    def __init__(self, db_path, timeout_seconds=TIMEOUT_SECONDS, max_rows=MAX_ROWS, pool=None):
+        self.db_path = db_path
+        self.pool = pool
+        self.timeout_seconds = timeout_seconds
+        self.max_rows = max_rows
+        self._local = threading.local()
+
+    def connect(self):
+        uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+        return sqlite3.connect(uri, uri=True)
+
+    def _connection(self):
+        if not hasattr(self._local, "conn"):
+            self._local.conn = self.connect()
+        return self._local.conn
+
+    def run(self, query, conn=None):
+        if conn is None and self.pool is not None:
+            with self.pool.connection() as pooled:
+                return self._run(query, pooled)
+        return self._run(query, conn or self._connection())
+
+    def _run(self, query, conn):
+        deadline = time.monotonic() + self.timeout_seconds
+        timed_out = False
+
+        def check_deadline():
+            nonlocal timed_out
+            timed_out = time.monotonic() > deadline
+            return 1 if timed_out else 0
+
+        conn.set_progress_handler(check_deadline, PROGRESS_STEPS)
+        try:
+            cursor = conn.execute(query)
+            if cursor.description is None:
+                return ""
+            columns = [column[0] for column in cursor.description]
+            rows, total, complete = [], 0, True
+            try:
+                while batch := cursor.fetchmany(FETCH_BATCH):
+                    total += len(batch)
+                    if len(rows) < self.max_rows:
+                        rows.extend(batch[:self.max_rows - len(rows)])
+            except sqlite3.OperationalError:
+                if not timed_out or not rows:
+                    raise
+                complete = False
+            if not total:
+                return ""
+            return encode_rows(columns, rows, total, complete)
+        except sqlite3.Error as err:
+            if timed_out:
+                return (f"Error: Query exceeded the {self.timeout_seconds:g}s time limit. "
+                        "Add filters, avoid cross joins and limit the result.")
+            return f"Error: {err}"
+        finally:
+            conn.set_progress_handler(None, 0)
@@ -0,0 +1,144 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+
+MEMORY_PATH = "sql_memory.sqlite"
+REUSE_THRESHOLD = float(os.getenv("SQL_MEMORY_REUSE", "0.95"))
+EXAMPLE_THRESHOLD = float(os.getenv("SQL_MEMORY_EXAMPLES", "0.75"))
+MAX_EXAMPLES = 3
+NUMBER_RE = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _mask(question):
+    """Numbers become N, so questions that differ only in a parameter embed to the same point."""
+    return NUMBER_RE.sub("N", " ".join(question.lower().split()))
+
+
+def _adapt(stored_question, stored_sql, question):
+    """
+    The stored SQL rewritten for the new question's numbers, or None when that is not safe:
+    each number of the stored question must appear exactly once in its SQL to be swapped.
+    """
+    old, new = NUMBER_RE.findall(stored_question), NUMBER_RE.findall(question)
+    if old == new:
+        return stored_sql
+    if len(old) != len(new):
+        return None
+    sql = stored_sql
+    for before, after in zip(old, new):
+        pattern = re.compile(rf"(?<![\w.]){re.escape(before)}(?![\w.])")
+        if len(pattern.findall(sql)) != 1:
+            return None
+        sql = pattern.sub(after, sql)
+    return sql
+
+
+class SQLMemory:
+    """
+    Successful (question, SQL, schema_version) triples, persisted in SQLite with the question
+    embedding. recall() returns SQL to run directly for a near-identical question and a few
+    similar pairs as prompt examples otherwise. Entries from another schema_version are ignored
+    and deleted the first time a new version is seen.
+    """
+
+    def __init__(self, embeddings, path=MEMORY_PATH, reuse_threshold=REUSE_THRESHOLD,
+                 example_threshold=EXAMPLE_THRESHOLD, max_examples=MAX_EXAMPLES):
+        self.embeddings = embeddings
+        self.reuse_threshold = reuse_threshold
+        self.example_threshold = example_threshold
+        self.max_examples = max_examples
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory (question TEXT, schema_version INTEGER, sql TEXT, "
+            "vector BLOB, stored_at REAL, PRIMARY KEY (question, schema_version))")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._version = None
+        self._questions, self._sqls, self._matrix = [], [], np.zeros((0, 0), dtype=np.float32)
+        self.stats = {"reused": 0, "examples": 0, "misses": 0, "stored": 0}
+
+    def _load(self, schema_version):
+        if schema_version == self._version:
+            return
+        deleted = self._conn.execute("DELETE FROM memory WHERE schema_version != ?", (schema_version,)).rowcount
+        self._conn.commit()
+        if deleted:
+            print(f"---SQL MEMORY: schema_version {schema_version}, dropped {deleted} stale entries---")
+        rows = self._conn.execute("SELECT question, sql, vector FROM memory WHERE schema_version = ?", (schema_version,)).fetchall()
+        self._questions = [row[0] for row in rows]
+        self._sqls = [row[1] for row in rows]
+        self._matrix = (np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+                        if rows else np.zeros((0, 0), dtype=np.float32))
+        self._version = schema_version
+
+    def recall(self, question, schema_version):
+        """Return (sql to reuse or None, list of (question, sql) examples)."""
+        vector = _normalize(self.embeddings.embed_query(_mask(question)))
+        with self._lock:
+            self._load(schema_version)
+            if not self._questions:
+                self.stats["misses"] += 1
+                return None, []
+            scores = self._matrix @ vector
+            order = np.argsort(-scores)
+        best = order[0]
+        if scores[best] >= self.reuse_threshold:
+            sql = _adapt(self._questions[best], self._sqls[best], question)
+            if sql is not None:
+                self.stats["reused"] += 1
+                return sql, []
+        examples = [(self._questions[i], self._sqls[i]) for i in order[:self.max_examples]
+                    if scores[i] >= self.example_threshold]
+        self.stats["examples" if examples else "misses"] += 1
+        return None, examples
+
+    def remember(self, question, sql, schema_version):
+        vector = _normalize(self.embeddings.embed_query(_mask(question)))
+        with self._lock:
+            self._load(schema_version)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO memory (question, schema_version, sql, vector, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (question, schema_version, sql, vector.tobytes(), time.time()),
+            )
+            self._conn.commit()
+            if question in self._questions:
+                self._sqls[self._questions.index(question)] = sql
+            else:
+                self._questions.append(question)
+                self._sqls.append(sql)
+                self._matrix = np.vstack([self._matrix.reshape(-1, vector.shape[0]), vector])
+            self.stats["stored"] += 1
+
+
+def examples_message(examples):
+    lines = ["Questions answered earlier against this schema and the SQL that answered them:"]
+    for question, sql in examples:
+        lines.append(f"Question: {question}\nSQL: {sql}")
+    return SystemMessage(content="\n\n".join(lines))
+
+
+def last_successful_sql(messages):
+    """The query of the most recent db_query_tool call whose result was not an error."""
+    results = {message.tool_call_id: message.content for message in messages if isinstance(message, ToolMessage)}
+    for message in reversed(messages):
+        for tool_call in reversed(getattr(message, "tool_calls", None) or []):
+            if tool_call["name"] == "db_query_tool":
+                result = results.get(tool_call["id"])
+                if result is not None and not result.startswith("Error:"):
+                    return tool_call["args"].get("query")
+    return None
+
+
+def first_question(messages):
+    return next((message.content for message in messages if isinstance(message, HumanMessage)), None)
@@ -0,0 +1,173 @@
+import os
+import re
+import sqlite3
+import threading
+
+from query_cache import TOKEN_RE
+
+FENCE_RE = re.compile(r"```(?:sql)?\s*(.*?)```", re.IGNORECASE | re.DOTALL)
+#A query starts on its own line; "select" or "with" inside a sentence is prose
+START_RE = re.compile(r"^[ \t]*(?:select|with)\b", re.IGNORECASE | re.MULTILINE)
+BLANK_LINE_RE = re.compile(r"\n[ \t]*\n")
+WRITE_KEYWORDS = {"insert", "update", "delete", "drop", "alter", "create", "replace", "attach", "detach",
+                  "pragma", "vacuum", "reindex", "analyze"}
+STATEMENT_RE = re.compile(r"^[ \t]*(?:select|with|%s)\b" % "|".join(sorted(WRITE_KEYWORDS)), re.IGNORECASE | re.MULTILINE)
+CLAUSE_END = {"join", "inner", "left", "right", "full", "cross", "natural", "where", "group", "order", "limit",
+              "having", "union", "except", "intersect", "on", "using", ")", ","}
+
+
+def extract_sql(text):
+    """
+    Pull the query out of query_gen's reply, which may wrap it in a code fence or prose. The query
+    starts at the first line beginning with SELECT or WITH and ends at the first top-level ; (or,
+    outside a fence, the first blank line). Returns None when that is ambiguous - several fences,
+    or another statement after the first - so the validator escalates instead of rejecting.
+    """
+    fences = FENCE_RE.findall(text)
+    if len(fences) > 1:
+        return None
+    if fences:
+        text = fences[0]
+    start = START_RE.search(text)
+    if not start:
+        return None
+    text = text[start.start():]
+    depth = 0
+    for match in TOKEN_RE.finditer(text):
+        kind, token = match.lastgroup, match.group()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0 and (token == ";" or (not fences and kind == "space" and BLANK_LINE_RE.search(token))):
+            if STATEMENT_RE.search(text[match.end():]):
+                return None
+            return text[:match.start()].strip()
+    return text.strip()
+
+
+def tokenize(sql):
+    tokens = []
+    for match in TOKEN_RE.finditer(sql):
+        kind, text = match.lastgroup, match.group()
+        if kind in ("comment", "space"):
+            continue
+        if kind == "quoted":
+            tokens.append(("word", text[1:-1].lower()))
+        else:
+            tokens.append((kind, text.lower() if kind == "word" else text))
+    return tokens
+
+
+class SQLValidator:
+    """
+    Checks generated SQL locally instead of sending it through the query_check LLM prompt.
+
+    validate() returns one of:
+      ("ok", sql)         single read-only statement that SQLite prepares and whose joins look sane
+      ("reject", error)   write statements, several statements, or anything EXPLAIN refuses
+      ("escalate", why)   legal but suspicious: NOT IN over a subquery, UNION without ALL, or a
+                          join on columns that are neither a foreign key pair nor the same name
+    """
+
+    def __init__(self, db_path):
+        uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._schema_version = None
+        self.columns = {}
+        self.foreign_keys = set()
+        self.stats = {"ok": 0, "reject": 0, "escalate": 0}
+
+    def _load_schema(self):
+        version = self._conn.execute("PRAGMA schema_version").fetchone()[0]
+        if version == self._schema_version:
+            return
+        tables = [row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")]
+        self.columns, self.foreign_keys = {}, set()
+        for table in tables:
+            info = self._conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+            self.columns[table.lower()] = {row[1].lower() for row in info}
+            for fk in self._conn.execute(f'PRAGMA foreign_key_list("{table}")'):
+                pair = ((table.lower(), fk[3].lower()), (fk[2].lower(), (fk[4] or "").lower()))
+                self.foreign_keys.add(pair)
+                self.foreign_keys.add(pair[::-1])
+        self._schema_version = version
+
+    def _aliases(self, tokens):
+        aliases = {}
+        for i, (kind, text) in enumerate(tokens[:-1]):
+            if text in ("from", "join") and tokens[i + 1][0] == "word" and tokens[i + 1][1] in self.columns:
+                table = tokens[i + 1][1]
+                aliases[table] = table
+                j = i + 2
+                if j < len(tokens) and tokens[j][1] == "as":
+                    j += 1
+                if j < len(tokens) and tokens[j][0] == "word" and tokens[j][1] not in CLAUSE_END | {"as"}:
+                    aliases[tokens[j][1]] = table
+        return aliases
+
+    def _join_pairs(self, tokens):
+        """Yield (left, right) qualified column references from every ON clause equality."""
+        for i, (_, text) in enumerate(tokens):
+            if text != "on":
+                continue
+            j = i + 1
+            clause = []
+            while j < len(tokens) and tokens[j][1] not in CLAUSE_END:
+                clause.append(tokens[j])
+                j += 1
+            #a . x = b . y
+            for k in range(len(clause) - 6):
+                a, dot1, x, eq, b, dot2, y = clause[k:k + 7]
+                if dot1[1] == "." and eq[1] == "=" and dot2[1] == ".":
+                    yield (a[1], x[1]), (b[1], y[1])
+
+    def _suspicious_join(self, tokens):
+        aliases = self._aliases(tokens)
+        for (left_alias, left_col), (right_alias, right_col) in self._join_pairs(tokens):
+            left, right = aliases.get(left_alias), aliases.get(right_alias)
+            if left is None or right is None:
+                continue
+            if ((left, left_col), (right, right_col)) in self.foreign_keys:
+                continue
+            if left_col == right_col:
+                continue
+            return f"join on {left}.{left_col} = {right}.{right_col} is not a declared foreign key"
+        return None
+
+    def validate(self, sql):
+        result = self._validate(sql)
+        self.stats[result[0]] += 1
+        return result
+
+    def _validate(self, sql):
+        if not sql:
+            return "escalate", "no single SQL query could be picked out of the reply"
+        tokens = tokenize(sql.strip().rstrip(";"))
+        if any(text == ";" for _, text in tokens):
+            return "reject", "Error: Only one SQL statement can be run at a time."
+        if not tokens or tokens[0][1] not in ("select", "with"):
+            return "reject", "Error: Only SELECT queries are allowed. Do not make DML statements."
+        for i, (kind, text) in enumerate(tokens):
+            is_function = i + 1 < len(tokens) and tokens[i + 1][1] == "("
+            if kind == "word" and text in WRITE_KEYWORDS and not is_function:
+                return "reject", f"Error: {text.upper()} statements are not allowed. Only query the database."
+
+        with self._lock:
+            self._load_schema()
+            try:
+                self._conn.execute(f"EXPLAIN {sql.strip().rstrip(';')}")
+            except sqlite3.Error as err:
+                return "reject", f"Error: {err}. Please rewrite your query and try again."
+
+        words = [text for _, text in tokens]
+        for i, text in enumerate(words[:-2]):
+            if text == "not" and words[i + 1] == "in" and words[i + 2] == "(" and i + 3 < len(words) and words[i + 3] == "select":
+                return "escalate", "NOT IN over a subquery returns nothing if the subquery yields NULL"
+            if text == "union" and words[i + 1] != "all":
+                return "escalate", "UNION removes duplicates; UNION ALL may have been intended"
+        suspicious = self._suspicious_join(tokens)
+        if suspicious:
+            return "escalate", suspicious
+        return "ok", sql.strip().rstrip(";")